@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AnalyticsappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analyticsApp'
+
+    def ready(self):
+        import analyticsApp.signals
@@ -0,0 +1,115 @@
+"""
+Redis cache for the analytics and billing reads.
+
+Responses are cached per account, scope, view and period under the
+account's current version token for that scope. Writes to the underlying
+data (rollup deltas and rebuilds, billing rows, the account itself)
+replace the token, so stale entries are never read again and simply
+expire. A miss is recomputed by one request at a time: the first takes a
+short lock with cache.add() and the others wait briefly for its result
+instead of all running the same aggregate.
+"""
+import time
+import uuid
+import hashlib
+import logging
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+
+logger = logging.getLogger(__name__)
+
+
+def _version_key(scope, user_id):
+    return f"analytics_cache:{scope}:version:{user_id}"
+
+
+def invalidate(scope, user_ids):
+    """
+    Give each account a new version token for the scope. Done now, for
+    reads later in this transaction, and again after commit, so a read
+    racing the commit cannot cache the old rows under the new token.
+    """
+    keys = [_version_key(scope, user_id) for user_id in {user_id for user_id in user_ids if user_id}]
+    if not keys:
+        return
+
+    def replace_tokens():
+        try:
+            cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+        except Exception as e:
+            logger.warning("Analytics cache invalidation failed: %s", e)
+
+    replace_tokens()
+    transaction.on_commit(replace_tokens)
+
+
+def _entry_key(scope, view_name, request):
+    token_key = _version_key(scope, request.user.pk)
+    token = cache.get(token_key)
+    if token is None:
+        cache.add(token_key, uuid.uuid4().hex, None)
+        token = cache.get(token_key)
+    # Several views count relative to today, so the day is part of the period.
+    period = f"{date.today().isoformat()}|{sorted(request.query_params.lists())}"
+    digest = hashlib.sha1(period.encode()).hexdigest()
+    return f"analytics_cache:{scope}:{request.user.pk}:{token}:{view_name}:{digest}"
+
+
+def _wait_for(key, lock):
+    """The entry another request is computing, or None once its lock is gone or the wait is over."""
+    deadline = time.monotonic() + getattr(settings, "ANALYTICS_CACHE_WAIT_SECONDS", 2)
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        found = cache.get_many([key, lock])
+        if key in found:
+            return found[key]
+        if lock not in found:
+            return None
+    return None
+
+
+def cached_response(scope):
+    """
+    Decorator for APIView.get: serves 200 responses from the cache. Redis
+    errors are treated as misses, so the view still answers without it.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            try:
+                key = _entry_key(scope, type(self).__name__, request)
+                data = cache.get(key)
+            except Exception as e:
+                logger.warning("Analytics cache read failed: %s", e)
+                return view_method(self, request, *args, **kwargs)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+
+            lock = f"{key}:lock"
+            try:
+                leader = cache.add(lock, 1, getattr(settings, "ANALYTICS_CACHE_LOCK_SECONDS", 10))
+                data = None if leader else _wait_for(key, lock)
+            except Exception as e:
+                logger.warning("Analytics cache lock failed: %s", e)
+                leader, data = False, None
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+
+            response = view_method(self, request, *args, **kwargs)
+            if leader:
+                try:
+                    if response.status_code == status.HTTP_200_OK:
+                        cache.set(key, response.data, getattr(settings, "ANALYTICS_CACHE_TIMEOUT", 60 * 15))
+                    cache.delete(lock)
+                except Exception as e:
+                    logger.warning("Analytics cache write failed: %s", e)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('active_patients', models.IntegerField(default=0)),
+                ('upcoming', models.IntegerField(default=0)),
+                ('missed', models.IntegerField(default=0)),
+                ('completed_admin_doctor', models.IntegerField(default=0)),
+                ('completed_government', models.IntegerField(default=0)),
+                ('completed_private', models.IntegerField(default=0)),
+                ('completed_other', models.IntegerField(default=0)),
+                ('messages_sent', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Doctor Daily Stats',
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='unique_doctor_daily_stats')],
+            },
+        ),
+    ]
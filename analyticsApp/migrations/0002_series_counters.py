@@ -0,0 +1,56 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+OTHER_COUNTERS = [
+    "active_patients", "upcoming", "missed", "completed_admin_doctor", "completed_government",
+    "completed_private", "completed_other", "messages_sent",
+]
+
+
+def backfill_series_counters(apps, schema_editor):
+    # Set-based, one upsert per counter; the nightly rebuild would fill them too.
+    quote = schema_editor.quote_name
+    stats = quote(apps.get_model("analyticsApp", "DoctorDailyStats")._meta.db_table)
+    patients = quote(apps.get_model("patientApp", "Patient")._meta.db_table)
+    vaccines = quote(apps.get_model("patientApp", "PatientVaccine")._meta.db_table)
+    zeros = ", ".join("0" for _ in OTHER_COUNTERS)
+    sources = {
+        "patients_added": f"SELECT user_id, (created_at AT TIME ZONE %s)::date, COUNT(*) FROM {patients} "
+                          f"WHERE user_id IS NOT NULL GROUP BY 1, 2",
+        "vaccines_due": f"SELECT user_id, due_date, COUNT(*) FROM {vaccines} "
+                        f"WHERE user_id IS NOT NULL AND due_date IS NOT NULL GROUP BY 1, 2",
+    }
+    for counter, source in sources.items():
+        schema_editor.execute(
+            f"""
+            INSERT INTO {stats} (user_id, day, {counter}, {", ".join(OTHER_COUNTERS)})
+            SELECT c.user_id, c.day, c.n, {zeros} FROM ({source}) AS c(user_id, day, n)
+            ON CONFLICT (user_id, day) DO UPDATE SET {counter} = EXCLUDED.{counter}
+            """,
+            [settings.TIME_ZONE] if counter == "patients_added" else None,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analyticsApp', '0001_doctor_daily_stats'),
+        ('patientApp', '0009_appointment_counts_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctordailystats',
+            name='patients_added',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='doctordailystats',
+            name='vaccines_due',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_series_counters, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,39 @@
 from django.db import models
 
-# Create your models here.
+from authenticationApp.models import User
+
+
+class DoctorDailyStats(models.Model):
+    """
+    Per-account, per-day dashboard counters, each bucketed by the day it is
+    reported against: patients (all, and still active) by registration day,
+    open vaccines by status and all vaccines by due date, completions by
+    completion day and source, and reminder messages by send day. Totals
+    over any window are sums over a few rows.
+
+    Kept current by analyticsApp.signals and the bulk write paths, and
+    rebuilt from the source tables nightly by reconcile_doctor_stats.
+    Counters are signed so a delta applied out of order never fails a write.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_stats")
+    day = models.DateField()
+
+    active_patients = models.IntegerField(default=0)
+    patients_added = models.IntegerField(default=0)
+    upcoming = models.IntegerField(default=0)
+    missed = models.IntegerField(default=0)
+    vaccines_due = models.IntegerField(default=0)
+    completed_admin_doctor = models.IntegerField(default=0)
+    completed_government = models.IntegerField(default=0)
+    completed_private = models.IntegerField(default=0)
+    completed_other = models.IntegerField(default=0)
+    messages_sent = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='unique_doctor_daily_stats'),
+        ]
+        verbose_name_plural = 'Doctor Daily Stats'
+
+    def __str__(self):
+        return f"{self.user_id} {self.day}"
@@ -0,0 +1,193 @@
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from analyticsApp.cache import invalidate
+from analyticsApp.models import DoctorDailyStats
+from authenticationApp.models import User
+from doctorApp.models import ReminderLog
+from patientApp.models import Patient, PatientVaccine
+
+
+COUNTERS = [
+    "active_patients", "patients_added", "upcoming", "missed", "vaccines_due",
+    "completed_admin_doctor", "completed_government", "completed_private", "completed_other",
+    "messages_sent",
+]
+
+COMPLETION_COUNTERS = {
+    "Admin Doctor": "completed_admin_doctor",
+    "Government Hospital": "completed_government",
+    "Other Private Hospital": "completed_private",
+}
+
+# Advisory lock namespace: a rebuild holds each account's lock exclusively,
+# apply_deltas() holds it shared, so deltas never land between a rebuild's
+# read of the source tables and its rewrite of the rows.
+ROLLUP_LOCK_CLASS = 4711
+
+# Columns read to place a vaccine in the rollup, in vaccine_bucket() order.
+VACCINE_FIELDS = ("user_id", "due_date", "status", "is_completed", "completed_on", "completed_at", "patient__is_active")
+
+
+def vaccine_bucket(user_id, due_date, status, is_completed, completed_on, completed_at, patient_active):
+    """The (user_id, day, counter) a vaccine counts towards, or None."""
+    if is_completed:
+        if completed_on is None:
+            return None
+        return user_id, completed_on, COMPLETION_COUNTERS.get(completed_at, "completed_other")
+    if not patient_active or due_date is None:
+        return None
+    if status == "Upcoming":
+        return user_id, due_date, "upcoming"
+    if status == "Pending":
+        return user_id, due_date, "missed"
+    return None
+
+
+def due_bucket(user_id, due_date):
+    """Every vaccine counts once on its due date, whatever its status, for the monthly series."""
+    if due_date is None:
+        return None
+    return user_id, due_date, "vaccines_due"
+
+
+def patient_bucket(user_id, created_at, is_active):
+    if not is_active or created_at is None:
+        return None
+    return user_id, timezone.localdate(created_at), "active_patients"
+
+
+def added_bucket(user_id, created_at):
+    """Every patient counts once on their registration day, active or not."""
+    if created_at is None:
+        return None
+    return user_id, timezone.localdate(created_at), "patients_added"
+
+
+def vaccine_rows(queryset):
+    """(bucket, count) for a PatientVaccine queryset, grouped in the database."""
+    grouped = queryset.values(*VACCINE_FIELDS).annotate(n=Count("id")).order_by()
+    rows = []
+    for row in grouped:
+        rows.append((vaccine_bucket(*(row[field] for field in VACCINE_FIELDS)), row["n"]))
+        rows.append((due_bucket(row["user_id"], row["due_date"]), row["n"]))
+    return rows
+
+
+def open_vaccine_deltas(queryset, sign):
+    """Deltas adding (sign=1) or removing (sign=-1) a queryset's open vaccines, as counted for active patients."""
+    deltas = Counter()
+    grouped = queryset.filter(is_completed=False).values_list("user_id", "due_date", "status") \
+        .annotate(n=Count("id")).order_by()
+    for user_id, due_date, status, n in grouped:
+        bucket = vaccine_bucket(user_id, due_date, status, False, None, None, True)
+        if bucket:
+            deltas[bucket] += sign * n
+    return deltas
+
+
+def apply_deltas(deltas):
+    """
+    Add signed counter deltas, a Counter of (user_id, day, counter) -> n,
+    to the rollup in one upsert. Accounts that no longer exist are skipped.
+    Waits for a rebuild of the same accounts to finish, see ROLLUP_LOCK_CLASS.
+    """
+    rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for bucket, n in deltas.items():
+        if bucket and n:
+            user_id, day, counter = bucket
+            rows[(user_id, day)][counter] += n
+    if not rows:
+        return
+
+    keys = sorted(rows)
+    params = {
+        "lock_class": ROLLUP_LOCK_CLASS,
+        "user_ids": [user_id for user_id, _ in keys],
+        "days": [day for _, day in keys],
+        **{counter: [rows[key][counter] for key in keys] for counter in COUNTERS},
+    }
+    table = connection.ops.quote_name(DoctorDailyStats._meta.db_table)
+    users = connection.ops.quote_name(User._meta.db_table)
+    arrays = ", ".join(f"%({counter})s::integer[]" for counter in COUNTERS)
+    columns = ", ".join(COUNTERS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH d AS MATERIALIZED (
+                SELECT d.*, pg_advisory_xact_lock_shared(%(lock_class)s, d.user_id::integer)
+                FROM unnest(%(user_ids)s::bigint[], %(days)s::date[], {arrays}) AS d(user_id, day, {columns})
+                ORDER BY d.user_id
+            )
+            INSERT INTO {table} (user_id, day, {columns})
+            SELECT d.user_id, d.day, {", ".join(f"d.{counter}" for counter in COUNTERS)}
+            FROM d
+            JOIN {users} u ON u.id = d.user_id
+            ON CONFLICT (user_id, day) DO UPDATE SET
+                {", ".join(f"{counter} = {table}.{counter} + EXCLUDED.{counter}" for counter in COUNTERS)}
+            """,
+            params,
+        )
+    invalidate("analytics", params["user_ids"])
+
+
+def changed(before, after):
+    """Deltas moving one row from bucket `before` to bucket `after`."""
+    deltas = Counter()
+    if before != after:
+        if before:
+            deltas[before] -= 1
+        if after:
+            deltas[after] += 1
+    return deltas
+
+
+def _counts_for(user_ids):
+    """Rollup rows for the given accounts, recomputed from the source tables."""
+    rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    patients = Patient.objects.filter(user_id__in=user_ids) \
+        .values("user_id", day=TruncDate("created_at")) \
+        .annotate(n=Count("id"), active=Count("id", filter=Q(is_active=True))).order_by()
+    for row in patients:
+        rows[(row["user_id"], row["day"])]["patients_added"] += row["n"]
+        rows[(row["user_id"], row["day"])]["active_patients"] += row["active"]
+
+    for bucket, n in vaccine_rows(PatientVaccine.objects.filter(user_id__in=user_ids)):
+        if bucket:
+            user_id, day, counter = bucket
+            rows[(user_id, day)][counter] += n
+
+    messages = ReminderLog.objects.filter(doctor_user_id__in=user_ids, status="success") \
+        .values("doctor_user_id", day=TruncDate("created_at")).annotate(n=Count("id")).order_by()
+    for row in messages:
+        rows[(row["doctor_user_id"], row["day"])]["messages_sent"] += row["n"]
+
+    return rows
+
+
+def rebuild_doctor_stats(user_ids):
+    """
+    Replace the given accounts' rollup rows with freshly computed ones,
+    reading and writing under the accounts' rollup locks. Returns rows written.
+    """
+    user_ids = sorted(set(user_ids))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(%s, id) FROM unnest(%s::integer[]) AS id ORDER BY id",
+                [ROLLUP_LOCK_CLASS, user_ids],
+            )
+        rows = _counts_for(user_ids)
+        DoctorDailyStats.objects.filter(user_id__in=user_ids).delete()
+        written = DoctorDailyStats.objects.bulk_create([
+            DoctorDailyStats(user_id=user_id, day=day, **counters)
+            for (user_id, day), counters in rows.items()
+            if any(counters.values())
+        ])
+    invalidate("analytics", user_ids)
+    return len(written)
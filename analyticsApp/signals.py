@@ -0,0 +1,132 @@
+from collections import Counter
+
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from analyticsApp.cache import invalidate
+from analyticsApp.rollups import VACCINE_FIELDS, added_bucket, apply_deltas, changed, due_bucket, \
+    open_vaccine_deltas, patient_bucket, vaccine_bucket, vaccine_rows
+from authenticationApp.models import User
+from dashboardApp.models import BillingManagement
+from doctorApp.models import ReminderLog, VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+
+
+def _origin_is(kwargs, *models):
+    origin = kwargs.get("origin")
+    return isinstance(origin, models) or getattr(origin, "model", None) in models
+
+
+def _subtract(rows):
+    deltas = Counter()
+    for bucket, n in rows:
+        if bucket:
+            deltas[bucket] -= n
+    apply_deltas(deltas)
+
+
+# --- Signal: Move a vaccine between rollup buckets when it is saved ---
+@receiver(pre_save, sender=PatientVaccine)
+def remember_vaccine_bucket(sender, instance, **kwargs):
+    instance._rollup_before = instance._rollup_before_due = None
+    if not instance._state.adding:
+        before = PatientVaccine.objects.filter(pk=instance.pk).values_list(*VACCINE_FIELDS).first()
+        if before:
+            instance._rollup_before = vaccine_bucket(*before)
+            instance._rollup_before_due = due_bucket(before[0], before[1])
+            instance._rollup_patient_active = before[-1]
+
+
+@receiver(post_save, sender=PatientVaccine)
+def update_vaccine_rollup(sender, instance, **kwargs):
+    patient_active = getattr(instance, "_rollup_patient_active", None)
+    if patient_active is None:
+        patient_active = instance.patient.is_active
+    after = vaccine_bucket(
+        instance.user_id, instance.due_date, instance.status, instance.is_completed,
+        instance.completed_on, instance.completed_at, patient_active,
+    )
+    deltas = changed(getattr(instance, "_rollup_before", None), after)
+    deltas.update(changed(getattr(instance, "_rollup_before_due", None), due_bucket(instance.user_id, instance.due_date)))
+    apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=PatientVaccine)
+def remove_vaccine_from_rollup(sender, instance, **kwargs):
+    # Cascades are subtracted in bulk by the parent's pre_delete below.
+    if _origin_is(kwargs, PatientVaccine):
+        _subtract([
+            (vaccine_bucket(
+                instance.user_id, instance.due_date, instance.status, instance.is_completed,
+                instance.completed_on, instance.completed_at, instance.patient.is_active,
+            ), 1),
+            (due_bucket(instance.user_id, instance.due_date), 1),
+        ])
+
+
+# --- Signal: Count patients, and their open vaccines, while they are active ---
+@receiver(pre_save, sender=Patient)
+def remember_patient_active(sender, instance, **kwargs):
+    instance._rollup_was_active = None
+    if not instance._state.adding:
+        instance._rollup_was_active = Patient.objects.filter(pk=instance.pk).values_list("is_active", flat=True).first()
+
+
+@receiver(post_save, sender=Patient)
+def update_patient_rollup(sender, instance, created, **kwargs):
+    if created:
+        deltas = changed(None, added_bucket(instance.user_id, instance.created_at))
+        deltas.update(changed(None, patient_bucket(instance.user_id, instance.created_at, instance.is_active)))
+        apply_deltas(deltas)
+        return
+
+    was_active = instance._rollup_was_active
+    if was_active is None or was_active == instance.is_active:
+        return
+
+    deltas = changed(
+        patient_bucket(instance.user_id, instance.created_at, was_active),
+        patient_bucket(instance.user_id, instance.created_at, instance.is_active),
+    )
+    # Open vaccines only count for active patients.
+    deltas.update(open_vaccine_deltas(PatientVaccine.objects.filter(patient=instance), 1 if instance.is_active else -1))
+    apply_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Patient)
+def remove_patient_from_rollup(sender, instance, **kwargs):
+    if _origin_is(kwargs, User):
+        return  # the account's rollup rows are deleted with it
+    _subtract([
+        (patient_bucket(instance.user_id, instance.created_at, instance.is_active), 1),
+        (added_bucket(instance.user_id, instance.created_at), 1),
+        *vaccine_rows(PatientVaccine.objects.filter(patient=instance)),
+    ])
+
+
+@receiver(pre_delete, sender=VaccineSchedule)
+def remove_schedule_vaccines_from_rollup(sender, instance, **kwargs):
+    if _origin_is(kwargs, User, Patient):
+        return
+    _subtract(vaccine_rows(PatientVaccine.objects.filter(vaccine_schedule=instance)))
+
+
+# --- Signal: Count successful reminder messages ---
+@receiver(post_save, sender=ReminderLog)
+def count_reminder_message(sender, instance, created, **kwargs):
+    if created and instance.status == "success" and instance.doctor_user_id:
+        apply_deltas(Counter({(instance.doctor_user_id, timezone.localdate(instance.created_at), "messages_sent"): 1}))
+
+
+# --- Signal: Drop cached billing and account-level responses ---
+@receiver([post_save, post_delete], sender=BillingManagement)
+def invalidate_billing_cache(sender, instance, **kwargs):
+    invalidate("billing", [instance.user_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_account_cache(sender, instance, **kwargs):
+    # Responses carry the account's name, and billing its email and fees.
+    invalidate("analytics", [instance.pk])
+    invalidate("billing", [instance.pk])
@@ -0,0 +1,32 @@
+import logging
+
+from celery import shared_task
+from django.conf import settings
+
+from analyticsApp.rollups import rebuild_doctor_stats
+from authenticationApp.models import User
+from timelytots.query_budget import query_budget
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+# One id read, then a lock, three aggregates, a delete and an insert per batch of accounts.
+@query_budget(lambda: 1 + 6 * (User.objects.count() // getattr(settings, "ROLLUP_REBUILD_BATCH_SIZE", 200) + 1))
+def reconcile_doctor_stats():
+    """
+    Nightly task:
+    Rebuilds DoctorDailyStats from the source tables, a batch of accounts
+    at a time. Corrects drift from writes that skip the incremental path;
+    the nightly vaccine jobs keep the rollup current themselves.
+    """
+    batch_size = getattr(settings, "ROLLUP_REBUILD_BATCH_SIZE", 200)
+    user_ids = list(User.objects.order_by("id").values_list("id", flat=True))
+
+    rows = 0
+    for start in range(0, len(user_ids), batch_size):
+        rows += rebuild_doctor_stats(user_ids[start:start + batch_size])
+
+    logger.info("Doctor daily stats rebuilt: %s rows for %s accounts.", rows, len(user_ids))
+    return f"Doctor daily stats rebuilt: {rows} rows for {len(user_ids)} accounts."
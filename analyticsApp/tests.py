@@ -1,3 +1,327 @@
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from analyticsApp.cache import cached_response
 
-# Create your tests here.
+from analyticsApp.models import DoctorDailyStats
+from analyticsApp.rollups import COUNTERS, rebuild_doctor_stats
+from authenticationApp.models import User
+from doctorApp.models import ReminderLog, VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+from patientApp.tasks import mark_patients_inactive, update_vaccine_statuses
+from patientApp.utils import refresh_due_dates, sync_patient_vaccines
+
+
+class BatchRequestTest(TestCase):
+    """Tests for running dashboard reads through /api/batch/"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=date.today() + timedelta(days=3))
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_sub_requests_answered_in_one_call(self):
+        response = self.client.post("/api/batch/", {"requests": [
+            {"id": "patients", "path": "total/count/"},
+            {"id": "upcoming", "path": "/api/upcoming/appointments/?fields=id,due_date"},
+            {"id": "missing", "path": "no/such/endpoint/"},
+        ]}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        patients, upcoming, missing = response.data["responses"]
+        self.assertEqual((patients["id"], patients["status"], patients["body"]["total_patients"]), ("patients", 200, 1))
+        self.assertEqual(list(upcoming["body"][0]), ["id", "due_date"])
+        self.assertEqual(missing["status"], 404)
+
+    def test_only_reads_can_be_batched(self):
+        response = self.client.post("/api/batch/", {"requests": [{"method": "DELETE", "path": "patient/1/"}]}, format="json")
+        self.assertEqual(response.data["responses"][0]["status"], 405)
+
+        response = self.client.post("/api/batch/", {"requests": ["total/count/"] * 11}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_api_views_can_be_batched(self):
+        response = self.client.post("/api/batch/", {"requests": ["/admin/"]}, format="json")
+        self.assertEqual(response.data["responses"][0]["status"], 400)
+
+    def test_links_keep_the_callers_scheme_and_host(self):
+        PatientVaccine.objects.create(user=self.doctor, patient=Patient.objects.get(), due_date=date.today() + timedelta(days=9))
+        requests = {"requests": ["patient/vaccine/?limit=1"]}
+
+        response = self.client.post("/api/batch/", requests, format="json", secure=True, HTTP_HOST="app.timelytots.in")
+        self.assertTrue(response.data["responses"][0]["body"]["next"].startswith("https://app.timelytots.in/api/patient/vaccine/"))
+
+        response = self.client.post("/api/batch/", requests, format="json", HTTP_X_FORWARDED_PROTO="https")
+        self.assertTrue(response.data["responses"][0]["body"]["next"].startswith("https://"))
+
+
+class UpcomingAppointmentsCountTest(TestCase):
+    """All dashboard appointment counters come from one aggregate query"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.today = date.today()
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        inactive = Patient.objects.create(user=self.doctor, child_name="Ravi", mobile_number="9000000002",
+                                          date_of_birth=date(2024, 1, 1), is_active=False)
+        for owner, due, status in [(patient, self.today + timedelta(days=5), "Upcoming"),
+                                   (patient, self.today + timedelta(days=60), "Upcoming"),
+                                   (patient, self.today - timedelta(days=40), "Pending"),
+                                   (inactive, self.today + timedelta(days=5), "Upcoming")]:
+            PatientVaccine.objects.create(user=self.doctor, patient=owner, due_date=due, status=status)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_month_buckets_in_one_query(self):
+        later = self.today + timedelta(days=60)
+        earlier = self.today - timedelta(days=40)
+        months = [f"{day.year}-{day.month:02d}" for day in (earlier, later)]
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/upcoming/appointments/count/", {"months": ",".join(months)})
+
+        self.assertEqual(response.data["next_30_days_count"], 1)
+        self.assertEqual(response.data["missed_vaccines"], 1)
+        self.assertEqual(response.data["months"], [
+            {"month": months[0], "upcoming_count": 0, "missed_count": 1},
+            {"month": months[1], "upcoming_count": 1, "missed_count": 0},
+        ])
+
+    def test_single_month_and_bad_input(self):
+        later = self.today + timedelta(days=60)
+        response = self.client.get("/api/upcoming/appointments/count/", {"month": later.month, "year": later.year})
+        self.assertEqual((response.data["month"], response.data["custom_month_count"]), (later.month, 1))
+
+        response = self.client.get("/api/upcoming/appointments/count/", {"months": "2025-13"})
+        self.assertEqual(response.status_code, 400)
+
+
+class DoctorDailyStatsTest(TestCase):
+    """The incrementally maintained rollup always matches a rebuild from the source tables"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.today = date.today()
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def snapshot(self):
+        return {
+            row.pop("day"): row
+            for row in DoctorDailyStats.objects.filter(user=self.doctor).values("day", *COUNTERS)
+            if any(row[counter] for counter in COUNTERS)
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rebuild_doctor_stats([self.doctor.id])
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_writes_keep_rollup_in_step(self):
+        VaccineSchedule.objects.create(user=self.doctor, vaccine="OPV 1", age="6 Weeks")
+        VaccineSchedule.objects.create(user=self.doctor, vaccine="BCG", age="Birth")
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001",
+                                         date_of_birth=self.today - timedelta(days=20))
+        sync_patient_vaccines(patient)
+        self.assertMatchesRebuild()
+
+        opv = PatientVaccine.objects.get(patient=patient, vaccine_schedule__vaccine="OPV 1")
+        opv.is_completed, opv.status, opv.completed_on, opv.completed_at = True, "Completed", self.today, "Admin Doctor"
+        opv.save()
+        self.assertMatchesRebuild()
+
+        patient.date_of_birth = self.today - timedelta(days=60)
+        patient.save()
+        refresh_due_dates(patient_ids=[patient.id])
+        other = Patient.objects.create(user=self.doctor, child_name="Ravi", mobile_number="9000000002",
+                                       date_of_birth=self.today - timedelta(days=5))
+        sync_patient_vaccines(other)
+        self.assertMatchesRebuild()
+
+        pending = PatientVaccine.objects.filter(patient=other, is_completed=False).values_list("id", flat=True)
+        response = self.client.patch("/api/patient/vaccine/complete/bulk/",
+                                     {"ids": list(pending), "completed_at": "Government Hospital"}, format="json")
+        self.assertEqual(response.data["completed"], len(pending))
+        patient.is_active = False
+        patient.save()
+        ReminderLog.objects.create(recipient="9000000001", doctor_id=str(self.doctor.id), doctor_user=self.doctor, status="success")
+        self.assertMatchesRebuild()
+
+        PatientVaccine.objects.filter(patient=patient).first().delete()
+        other.delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_completion_counts_each_vaccine_once(self):
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        first, second = (PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=self.today + timedelta(days=days))
+                         for days in (3, 9))
+        self.client.patch(f"/api/patient/vaccine/complete/{first.id}/", {"completed_at": "Admin Doctor"}, format="json")
+
+        response = self.client.patch("/api/patient/vaccine/complete/bulk/",
+                                     {"ids": [first.id, second.id], "completed_at": "Admin Doctor"}, format="json")
+        self.assertEqual(response.data["completed"], 1)
+        self.assertEqual(self.snapshot()[self.today]["completed_admin_doctor"], 2)
+        self.assertMatchesRebuild()
+
+    def test_nightly_jobs_keep_rollup_in_step(self):
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        for due, status in [(self.today - timedelta(days=5), "Upcoming"), (self.today + timedelta(days=3), "Pending"),
+                            (self.today + timedelta(days=9), "Upcoming")]:
+            PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=due, status=status)
+
+        update_vaccine_statuses()
+        self.assertMatchesRebuild()
+        mark_patients_inactive()
+        self.assertMatchesRebuild()
+        self.assertEqual(self.snapshot()[timezone.localdate(patient.created_at)]["active_patients"], 1)
+
+        # A raw update skips the rollup, so start the second night from a rebuild.
+        PatientVaccine.objects.filter(patient=patient).update(due_date=self.today - timedelta(days=30))
+        rebuild_doctor_stats([self.doctor.id])
+        update_vaccine_statuses()
+        mark_patients_inactive()
+        self.assertFalse(Patient.objects.get(id=patient.id).is_active)
+        self.assertMatchesRebuild()
+
+    def test_rebuild_counts_rows_written(self):
+        Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        DoctorDailyStats.objects.create(user=self.doctor, day=self.today - timedelta(days=400))
+        self.assertEqual(rebuild_doctor_stats([self.doctor.id]), 1)
+
+    def test_counts_read_from_rollup(self):
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=self.today, is_completed=True,
+                                      status="Completed", completed_on=self.today, completed_at="Admin Doctor")
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/total/count/")
+        self.assertEqual(response.data["total_patients"], 1)
+
+        response = self.client.get("/api/complete/count/", {"month": self.today.month, "year": self.today.year})
+        self.assertEqual(response.data["completed_count"], 1)
+
+    def test_message_count_by_month(self):
+        other = User.objects.create(full_name="Dr. Other", email="other@test.com", account_type="doctor")
+        last_year = timezone.now() - timedelta(days=400)
+        for doctor, status, created_at in [(self.doctor, "success", timezone.now()),
+                                           (self.doctor, "success", timezone.now()),
+                                           (self.doctor, "failed", timezone.now()),
+                                           (self.doctor, "success", last_year),
+                                           (other, "success", timezone.now())]:
+            ReminderLog.objects.create(recipient="9000000001", doctor_id=str(doctor.id), doctor_user=doctor,
+                                       status=status, created_at=created_at)
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/message/count/", {"month": self.today.month, "year": self.today.year})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message_count"], 2)
+
+        response = self.client.get("/api/message/count/")
+        self.assertEqual(response.data["message_count"], 3)
+
+
+class MonthlySeriesTest(TestCase):
+    """A year of monthly series comes from one grouped rollup query"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.this_month = date.today().replace(day=1)
+        self.last_month = (self.this_month - timedelta(days=1)).replace(day=1)
+        self.patient = patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001",
+                                                        date_of_birth=date(2024, 1, 1))
+        PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=self.last_month, status="Pending")
+        PatientVaccine.objects.create(user=self.doctor, patient=patient, due_date=self.last_month, is_completed=True,
+                                      status="Completed", completed_on=self.last_month, completed_at="Government Hospital")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_default_range_is_last_twelve_months(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/monthly/series/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["months"]), 12)
+        self.assertEqual(response.data["months"][-1], f"{self.this_month.year}-{self.this_month.month:02d}")
+        self.assertEqual(response.data["patients_added"][-1], 1)
+        self.assertEqual(response.data["due"][-2:], [2, 0])
+        self.assertEqual(response.data["missed"][-2:], [1, 0])
+        self.assertEqual(response.data["completed"]["Government Hospital"][-2:], [1, 0])
+        self.assertEqual(sum(response.data["completed"]["Admin Doctor"]), 0)
+
+    def test_history_survives_status_and_active_changes(self):
+        missed = PatientVaccine.objects.get(patient=self.patient, status="Pending")
+        missed.is_completed, missed.status, missed.completed_on = True, "Completed", date.today()
+        missed.save()
+        self.patient.is_active = False
+        self.patient.save()
+
+        response = self.client.get("/api/monthly/series/")
+        self.assertEqual(response.data["patients_added"][-1], 1)
+        self.assertEqual(response.data["due"][-2:], [2, 0])
+
+    def test_range_validation(self):
+        month = f"{self.this_month.year}-{self.this_month.month:02d}"
+        response = self.client.get("/api/monthly/series/", {"start": month, "end": month})
+        self.assertEqual(response.data["months"], [month])
+
+        for params in ({"start": "2020-01", "end": "2025-01"}, {"start": "2025-02", "end": "2025-01"}, {"end": "2025-13"}):
+            response = self.client.get("/api/monthly/series/", params)
+            self.assertEqual(response.status_code, 400)
+
+
+class AnalyticsCacheTest(TestCase):
+    """Analytics reads are cached per account until a write replaces the version"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_write_invalidates_cached_count(self):
+        self.assertEqual(self.client.get("/api/total/count/").data["total_patients"], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/total/count/").data["total_patients"], 0)
+
+        Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        self.assertEqual(self.client.get("/api/total/count/").data["total_patients"], 1)
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        class SlowView:
+            @cached_response("analytics")
+            def get(self, request):
+                calls.append(1)
+                time.sleep(0.2)
+                return Response({"count": len(calls)})
+
+        def read(results):
+            request = Request(APIRequestFactory().get("/slow/", {"month": "1"}))
+            request.user = SimpleNamespace(pk=-self.doctor.pk)
+            results.append(SlowView().get(request).data)
+
+        results = []
+        threads = [threading.Thread(target=read, args=(results,)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"count": 1}] * 3)
+
+    def test_cache_errors_fall_back_to_the_database(self):
+        with patch("analyticsApp.cache.cache") as broken:
+            broken.get.side_effect = ConnectionError("redis is down")
+            response = self.client.get("/api/total/count/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["total_patients"], 0)
@@ -3,6 +3,11 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from datetime import date, timedelta
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from analyticsApp.cache import cached_response
+from analyticsApp.models import DoctorDailyStats
+from analyticsApp.rollups import COMPLETION_COUNTERS
 from patientApp.models import PatientVaccine
 from patientApp.models import Patient 
 import calendar
@@ -15,11 +20,15 @@ from doctorApp.models import ReminderLog
 
 class PatientCountView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2}
 
+    @cached_response("analytics")
     def get(self, request):
         try:
 
-            total_patients = Patient.objects.filter(user=request.user, is_active=True).count()
+            # Active patients are bucketed by registration day; the total is their sum.
+            total_patients = DoctorDailyStats.objects.filter(user=request.user) \
+                .aggregate(total=Coalesce(Sum("active_patients"), 0))["total"]
 
             return Response({"total_patients": total_patients}, status=status.HTTP_200_OK)
             
@@ -29,125 +38,229 @@ class PatientCountView(APIView):
             
 class UpcomingAppointmentsCountView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2}
+    max_months = 24
 
+    def get_months(self, request, today):
+        """
+        Month buckets as (label, first day, last day). ?months=2025-01,2025-02
+        asks for any list of months; the older ?month=&year= asks for one.
+        """
+        months = request.query_params.get("months")
+        if months:
+            labels = [label.strip() for label in months.split(",") if label.strip()]
+            if len(labels) > self.max_months:
+                raise ValueError(f"At most {self.max_months} months per request.")
+            buckets = []
+            for label in labels:
+                try:
+                    year, month = (int(part) for part in label.split("-"))
+                    start_date = date(year, month, 1)
+                except ValueError:
+                    raise ValueError("months must be a comma separated list of YYYY-MM values.")
+                buckets.append((label, start_date, date(year, month, calendar.monthrange(year, month)[1])))
+            return buckets
+
+        month = request.query_params.get("month", None)
+        year = request.query_params.get("year", None)
+        if not month or month.lower() == "all":
+            return []
+        month = int(month)
+        year = int(year) if year and year.isdigit() else today.year
+        return [(None, date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1]))]
+
+    @cached_response("analytics")
     def get(self, request):
         try:
             today = date.today()
             next_30_days = today + timedelta(days=30)
 
-            next_30_days_count = PatientVaccine.objects.filter(
-                user=request.user,
-                status="Upcoming",
-                is_completed=False,
-                due_date__range=[today, next_30_days],
-                patient__is_active=True
-            ).count()
+            try:
+                buckets = self.get_months(request, today)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-            month = request.query_params.get("month", None)
-            year = request.query_params.get("year", None)
+            # Every counter is a filtered SUM over the account's daily rollup
+            # rows, where open vaccines are bucketed by due date.
+            def upcoming(days):
+                return Coalesce(Sum("upcoming", filter=days), 0)
 
-            custom_month_count = None
-            missed_vaccines = None
+            def missed(days):
+                return Coalesce(Sum("missed", filter=days & Q(day__lt=today)), 0)
 
-            if month and month.lower() != "all":
-                month = int(month)
-                if year and year.isdigit():
-                    year = int(year)
-                else:
-                    year = today.year
-
-                start_date = date(year, month, 1)
-                last_day = calendar.monthrange(year, month)[1]
-                end_date = date(year, month, last_day)
-
-                custom_month_count = PatientVaccine.objects.filter(
-                    user=request.user,
-                    status="Upcoming",
-                    is_completed=False,
-                    due_date__range=[start_date, end_date],
-                    patient__is_active=True
-                ).count()
-
-                missed_vaccines = PatientVaccine.objects.filter(
-                    user=request.user,
-                    status="Upcoming",
-                    is_completed=False,
-                    due_date__lt=today,
-                    due_date__range=[start_date, end_date],
-                    patient__is_active=True
-                ).count()
-            else:
-                missed_vaccines = PatientVaccine.objects.filter(
-                    user=request.user,
-                    status="Upcoming",
-                    is_completed=False,
-                    due_date__lt=today,
-                    patient__is_active=True
-                ).count()
+            counters = {
+                "next_30_days": upcoming(Q(day__range=[today, next_30_days])),
+                "missed_total": missed(Q()),
+            }
+            for index, (_, start_date, end_date) in enumerate(buckets):
+                in_month = Q(day__range=[start_date, end_date])
+                counters[f"upcoming_{index}"] = upcoming(in_month)
+                counters[f"missed_{index}"] = missed(in_month)
 
-            return Response({
+            counts = DoctorDailyStats.objects.filter(user=request.user).aggregate(**counters)
+
+            month = request.query_params.get("month", None)
+            year = request.query_params.get("year", None)
+            data = {
                 "user": request.user.full_name,
                 "month": month if month else "All",
                 "year": year if year else "All",
-                "next_30_days_count": next_30_days_count,
-                "custom_month_count": custom_month_count,
-                "missed_vaccines": missed_vaccines
-            }, status=status.HTTP_200_OK)
+                "next_30_days_count": counts["next_30_days"],
+                "custom_month_count": None,
+                "missed_vaccines": counts["missed_total"],
+            }
+
+            if request.query_params.get("months"):
+                data["months"] = [
+                    {"month": label, "upcoming_count": counts[f"upcoming_{index}"], "missed_count": counts[f"missed_{index}"]}
+                    for index, (label, _, _) in enumerate(buckets)
+                ]
+            elif buckets:
+                data["month"], data["year"] = buckets[0][1].month, buckets[0][1].year
+                data["custom_month_count"] = counts["upcoming_0"]
+                data["missed_vaccines"] = counts["missed_0"]
+
+            return Response(data, status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
 class UserVaccineMessageCountView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2}
 
+    @cached_response("analytics")
     def get(self, request):
         try:
             user = request.user
             month = request.GET.get("month")
             year = request.GET.get("year")
 
-            logs = ReminderLog.objects.filter(user=user)
+            # Successful messages are counted per day in the rollup as they are logged.
+            stats = DoctorDailyStats.objects.filter(user=user)
 
             if month and month.lower() != "all":
-                logs = logs.filter(sent_at__month=int(month))
+                stats = stats.filter(day__month=int(month))
             if year and year.lower() != "all":
-                logs = logs.filter(sent_at__year=int(year))
+                stats = stats.filter(day__year=int(year))
 
             return Response({
                 "user": user.full_name,
                 "month": month or "All",
                 "year": year or "All",
-                "message_count": logs.count()
+                "message_count": stats.aggregate(total=Coalesce(Sum("messages_sent"), 0))["total"]
             })
         except Exception as e:
             return Response({"error": str(e)}, status=500)
             
 class CompletedByAdminDoctorCountAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2}
 
+    @cached_response("analytics")
     def get(self, request):
         try:
             user = request.user
             month = request.GET.get("month")
             year = request.GET.get("year")
 
-            vaccines = PatientVaccine.objects.filter(
-                user=user,
-                is_completed=True,
-                completed_at="Admin Doctor"
-            )
+            # Completions are bucketed by completion day and source.
+            stats = DoctorDailyStats.objects.filter(user=user)
 
             if month and month.lower() != "all":
-                vaccines = vaccines.filter(completed_on__month=int(month))
+                stats = stats.filter(day__month=int(month))
             if year and year.lower() != "all":
-                vaccines = vaccines.filter(completed_on__year=int(year))
+                stats = stats.filter(day__year=int(year))
 
             return Response({
                 "user": user.full_name,
                 "month": month or "All",
                 "year": year or "All",
-                "completed_count": vaccines.count()
+                "completed_count": stats.aggregate(total=Coalesce(Sum("completed_admin_doctor"), 0))["total"]
             })
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
+
+
+class MonthlySeriesView(APIView):
+    """
+    Monthly series for the dashboard charts, for ?start=YYYY-MM to
+    ?end=YYYY-MM (default: the last 12 months). Every series is summed from
+    the daily rollup in one GROUP BY month query; months without activity
+    are reported as 0.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 2}
+    max_months = 24
+
+    @staticmethod
+    def parse_month(label, name):
+        try:
+            year, month = (int(part) for part in label.split("-"))
+            return date(year, month, 1)
+        except ValueError:
+            raise ValueError(f"{name} must be a YYYY-MM value.")
+
+    def get_range(self, request, today):
+        end = request.query_params.get("end")
+        end = self.parse_month(end, "end") if end else today.replace(day=1)
+        start = request.query_params.get("start")
+        if start:
+            start = self.parse_month(start, "start")
+        else:
+            start = date(end.year - 1, end.month, 1) + timedelta(days=31)
+            start = start.replace(day=1)
+
+        months = []
+        month = start
+        while month <= end:
+            months.append(month)
+            if len(months) > self.max_months:
+                raise ValueError(f"At most {self.max_months} months per request.")
+            month = (month + timedelta(days=31)).replace(day=1)
+        if not months:
+            raise ValueError("start must not be after end.")
+        return months
+
+    @cached_response("analytics")
+    def get(self, request):
+        try:
+            today = date.today()
+            try:
+                months = self.get_range(request, today)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            last_day = months[-1].replace(day=calendar.monthrange(months[-1].year, months[-1].month)[1])
+            completion_counters = {**COMPLETION_COUNTERS, "Other": "completed_other"}
+
+            # Patients added and vaccines due are counted once, by registration
+            # day and due date, and never move afterwards; missed vaccines
+            # follow the count endpoints, completions count by completion day.
+            sums = {
+                "patients_added": Sum("patients_added"),
+                "due": Sum("vaccines_due"),
+                "missed": Sum("missed", filter=Q(day__lt=today)),
+                "messages_sent": Sum("messages_sent"),
+                **{counter: Sum(counter) for counter in completion_counters.values()},
+            }
+            rows = DoctorDailyStats.objects.filter(user=request.user, day__range=[months[0], last_day]) \
+                .annotate(month=TruncMonth("day")).values("month").annotate(**sums).order_by()
+            by_month = {row["month"]: row for row in rows}
+
+            def series(name):
+                return [(by_month.get(month) or {}).get(name) or 0 for month in months]
+
+            return Response({
+                "user": request.user.full_name,
+                "months": [f"{month.year}-{month.month:02d}" for month in months],
+                "patients_added": series("patients_added"),
+                "due": series("due"),
+                "missed": series("missed"),
+                "completed": {source: series(counter) for source, counter in completion_counters.items()},
+                "messages_sent": series("messages_sent"),
+            }, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
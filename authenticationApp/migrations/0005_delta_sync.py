@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticationApp', '0004_passwordresetcode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicdoctor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='clinicdoctor',
+            index=models.Index(fields=['clinic', 'updated_at', 'id'], name='authenticat_clinic__19e952_idx'),
+        ),
+    ]
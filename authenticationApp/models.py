@@ -64,6 +64,13 @@ class ClinicDoctor(models.Model):
     speciality = models.CharField(max_length=255)
     name = models.CharField(max_length=200)
     is_active = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync: a clinic's doctors changed since a point in time.
+            models.Index(fields=['clinic', 'updated_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.clinic.full_name})"
@@ -12,9 +12,10 @@ import random, string
 from django.template.loader import render_to_string
 from django.core.mail import EmailMultiAlternatives
 from timelytots import settings
+from timelytots.sparse_fields import SparseFieldsMixin
 from .models import PasswordResetCode
 
-class ClinicDoctorSerializer(serializers.ModelSerializer):
+class ClinicDoctorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ClinicDoctor
         fields = ["id", "name", "speciality", "is_active"]
@@ -0,0 +1,81 @@
+import hashlib
+from datetime import date
+from functools import wraps
+
+from django.db import connection
+from django.db.models import F, Q
+from rest_framework import status
+from rest_framework.response import Response
+
+from dashboardApp.models import DataVersion
+
+
+def bump_data_version(scope, user_ids):
+    """Move the scope's counter forward for each account in one upsert."""
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+
+    table = connection.ops.quote_name(DataVersion._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, scope, version)
+            SELECT user_id, %(scope)s, 1 FROM unnest(%(user_ids)s::bigint[]) AS user_id
+            ON CONFLICT (user_id, scope) DO UPDATE SET version = {table}.version + 1
+            """,
+            {"scope": scope, "user_ids": user_ids},
+        )
+
+
+def bump_global_data_version(scope):
+    """Invalidate the scope's ETags for every account, for bulk jobs that span accounts."""
+    updated = DataVersion.objects.filter(user__isnull=True, scope=scope).update(version=F("version") + 1)
+    if not updated:
+        DataVersion.objects.get_or_create(user=None, scope=scope, defaults={"version": 2})
+
+
+def compute_etag(request, scopes, extra=""):
+    """
+    Strong ETag for a read: the account's and the global counters for the
+    given scopes, plus the full path so each filter and page has its own tag.
+    """
+    versions = sorted(
+        DataVersion.objects.filter(Q(user=request.user) | Q(user__isnull=True), scope__in=scopes)
+        .values_list("scope", "user_id", "version"),
+        key=lambda row: (row[0], row[1] or 0),
+    )
+    source = f"{request.user.pk}|{versions}|{extra}|{request.get_full_path()}"
+    return '"%s"' % hashlib.sha1(source.encode()).hexdigest()
+
+
+def today_key(request):
+    """ETag input for views whose default window is relative to today."""
+    return date.today().isoformat()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    return etag in [tag.strip() for tag in header.split(",")] or header.strip() == "*"
+
+
+def conditional_get(*scopes, extra=None):
+    """
+    Decorator for APIView.get: answers 304 Not Modified when If-None-Match
+    carries the current ETag, before the view's query and serializer run.
+    `extra` may be a callable(request) for inputs outside the counters,
+    such as today's date for date-relative windows.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = compute_etag(request, scopes, extra(request) if extra else "")
+            if etag_matches(request, etag):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboardApp', '0002_billingmanagement_end_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('patients', 'Patients and vaccines'), ('schedules', 'Vaccine schedules'), ('billing', 'Billing')], max_length=20)),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='data_versions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Data Versions',
+                'constraints': [models.UniqueConstraint(fields=('user', 'scope'), name='unique_data_version_per_user_scope')],
+            },
+        ),
+    ]
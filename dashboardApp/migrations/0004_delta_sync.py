@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboardApp', '0003_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('patients', 'Patient'), ('patient_vaccines', 'Patient vaccine'), ('schedules', 'Vaccine schedule'), ('clinic_doctors', 'Clinic doctor')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Tombstones',
+                'indexes': [models.Index(fields=['user', 'deleted_at', 'id'], name='dashboardAp_user_id_9bb58a_idx')],
+            },
+        ),
+    ]
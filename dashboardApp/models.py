@@ -2,6 +2,7 @@ from django.db import models
 from django.core.validators import RegexValidator, EmailValidator
 from authenticationApp.models import User, ClinicDoctor
 from datetime import date
+from django.utils import timezone
 
 
 # Create your models here.
@@ -82,3 +83,54 @@ class BillingManagement(models.Model):
         return str(self.user)
 
 
+class DataVersion(models.Model):
+    """
+    Change counter per account and data scope, behind the ETags of list
+    endpoints. Rows with no user are global counters, bumped by nightly
+    jobs that touch many accounts at once.
+    """
+    SCOPES = [
+        ('patients', 'Patients and vaccines'),
+        ('schedules', 'Vaccine schedules'),
+        ('billing', 'Billing'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="data_versions")
+    scope = models.CharField(max_length=20, choices=SCOPES)
+    version = models.PositiveBigIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope'], name='unique_data_version_per_user_scope'),
+        ]
+        verbose_name_plural = 'Data Versions'
+
+    def __str__(self):
+        return f"{self.user_id or 'global'} {self.scope} v{self.version}"
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row for the delta sync API. Rows with no user are
+    deletions of shared catalog schedules, visible to every account.
+    """
+    ENTITIES = [
+        ('patients', 'Patient'),
+        ('patient_vaccines', 'Patient vaccine'),
+        ('schedules', 'Vaccine schedule'),
+        ('clinic_doctors', 'Clinic doctor'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name="tombstones")
+    entity = models.CharField(max_length=20, choices=ENTITIES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id']),
+        ]
+        verbose_name_plural = 'Tombstones'
+
+    def __str__(self):
+        return f"{self.entity} {self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
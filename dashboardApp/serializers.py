@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from authenticationApp.models import User
 from dashboardApp.models import Analytics, BillingManagement
+from timelytots.sparse_fields import SparseFieldsMixin
 
 
 class AnalyticsSerializers(serializers.ModelSerializer):
@@ -8,13 +10,24 @@ class AnalyticsSerializers(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class BillingManagementSerializers(serializers.ModelSerializer):
+class BillingUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'full_name', 'email', 'account_type']
+
+
+class BillingManagementSerializers(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField()
     monthly_subscription_fees = serializers.SerializerMethodField()
 
     class Meta:
         model = BillingManagement
         fields = '__all__'
+        expandable = {'user': BillingUserSerializer}
+        column_sources = {
+            'user': ['user__email', 'user__account_type'],
+            'monthly_subscription_fees': ['user__monthly_subscription_fees'],
+        }
 
     def get_monthly_subscription_fees(self, obj):
         if hasattr(obj.user, 'monthly_subscription_fees') and obj.user.monthly_subscription_fees is not None:
@@ -1,15 +1,18 @@
 from django.apps import apps
 from django.db.models.signals import post_save, post_delete
+from django.db import models
 from django.db.models import Sum
 from django.dispatch import receiver
 from django.utils import timezone
 from decimal import Decimal
 
-from doctorApp.models import ReminderLog
-from dashboardApp.models import BillingManagement
+from doctorApp.models import ReminderLog, VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+from dashboardApp.models import BillingManagement, Tombstone
 from authenticationApp.models import User, ClinicDoctor
 from dashboardApp.models import Analytics
 from dashboardApp.utils import get_previous_month_range
+from dashboardApp.etags import bump_data_version, bump_global_data_version
 
 GST_RATE = Decimal('0.18')
 
@@ -54,19 +57,86 @@ def update_total_revenue(sender, **kwargs):
     analytics.save()
 
 
+# --- Signal: Move ETag counters when account data changes ---
+def _deleting_account(kwargs):
+    # The account's counters are being deleted with it; re-inserting one would break the FK.
+    origin = kwargs.get("origin")
+    return isinstance(origin, User) or getattr(origin, "model", None) is User
+
+
+@receiver([post_save, post_delete], sender=Patient)
+@receiver([post_save, post_delete], sender=PatientVaccine)
+def bump_patients_version(sender, instance, **kwargs):
+    if not _deleting_account(kwargs):
+        bump_data_version("patients", [instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=VaccineSchedule)
+def bump_schedules_version(sender, instance, **kwargs):
+    if _deleting_account(kwargs):
+        return
+    # Patient vaccine reads render the schedule's name and age, so they move too.
+    if instance.user_id:
+        bump_data_version("schedules", [instance.user_id])
+        bump_data_version("patients", [instance.user_id])
+    if instance.user_id is None or instance.user.is_staff:
+        # Admin catalog entries appear in every account's schedule and vaccine lists.
+        bump_global_data_version("schedules")
+        bump_global_data_version("patients")
+
+
+@receiver([post_save, post_delete], sender=BillingManagement)
+def bump_billing_version(sender, instance, **kwargs):
+    if not _deleting_account(kwargs):
+        bump_data_version("billing", [instance.user_id])
+
+
+# --- Signal: Record tombstones for the delta sync API ---
+def _cascaded(instance, kwargs):
+    # Children removed with their parent are dropped by clients along with it.
+    origin = kwargs.get("origin")
+    if isinstance(origin, models.Model):
+        return type(origin) is not type(instance) or origin.pk != instance.pk
+    return getattr(origin, "model", type(instance)) is not type(instance)
+
+
+def _record_tombstone(entity, instance, user_id, kwargs):
+    if not _cascaded(instance, kwargs):
+        Tombstone.objects.create(user_id=user_id, entity=entity, object_id=instance.pk)
+
+
+@receiver(post_delete, sender=Patient)
+def tombstone_patient(sender, instance, **kwargs):
+    _record_tombstone("patients", instance, instance.user_id, kwargs)
+
+
+@receiver(post_delete, sender=PatientVaccine)
+def tombstone_patient_vaccine(sender, instance, **kwargs):
+    _record_tombstone("patient_vaccines", instance, instance.user_id, kwargs)
+
+
+@receiver(post_delete, sender=ClinicDoctor)
+def tombstone_clinic_doctor(sender, instance, **kwargs):
+    _record_tombstone("clinic_doctors", instance, instance.clinic_id, kwargs)
+
+
+@receiver(post_delete, sender=VaccineSchedule)
+def tombstone_schedule(sender, instance, **kwargs):
+    if _cascaded(instance, kwargs):
+        return
+    # Admin catalog entries are synced to every account, so their tombstones are too.
+    shared = instance.user_id is None or instance.user.is_staff
+    _record_tombstone("schedules", instance, None if shared else instance.user_id, kwargs)
+
+
 @receiver(post_save, sender=apps.get_model("doctorApp", "ReminderLog"))
 def update_billing_from_reminder(sender, instance, created, **kwargs):
     start_date, end_date = get_previous_month_range()
     if not created or instance.status != "success":
         return
 
-    doctor_id = instance.doctor_id
-    if not doctor_id:
-        return
-
-    try:
-        doctor = User.objects.get(id=doctor_id)
-    except User.DoesNotExist:
+    doctor = instance.doctor_user
+    if doctor is None:
         return
 
     if doctor.billing_method not in [
@@ -78,7 +148,7 @@ def update_billing_from_reminder(sender, instance, created, **kwargs):
 
     # ✅ Count previous-month messages
     msg_count = ReminderLog.objects.filter(
-        doctor_id=doctor_id,
+        doctor_user=doctor,
         status="success",
         created_at__date__gte=start_date,
         created_at__date__lte=end_date
@@ -1,3 +1,93 @@
-from django.test import TestCase
+from datetime import date
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from authenticationApp.models import User
+from dashboardApp.models import BillingManagement
+from doctorApp.models import VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class BillingManagementQueryBudgetTest(TestCase):
+    """The billing list stays within its query budget"""
+
+    def test_billing_list_within_budget(self):
+        doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        BillingManagement.objects.bulk_create([
+            BillingManagement(
+                user=doctor, start_date=date(2025, month, 1), end_date=date(2025, month, 28),
+                total_message_sent=10, billing_subtotal=100, gst_collected=18, previous_dues=0, total_bill_with_gst=118,
+            )
+            for month in range(1, 13)
+        ])
+
+        client = APIClient()
+        client.force_authenticate(doctor)
+        response = client.get("/api/billing/management/data/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 12)
+
+
+class ConditionalGetTest(TestCase):
+    """Reads answer 304 from the data version counters until the account's data changes"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.other = User.objects.create(full_name="Dr. Other Doctor", email="other@test.com", account_type="doctor")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def add_bill(self, user, month):
+        return BillingManagement.objects.create(
+            user=user, start_date=date(2025, month, 1), end_date=date(2025, month, 28),
+            total_message_sent=10, billing_subtotal=100, gst_collected=18, previous_dues=0, total_bill_with_gst=118,
+        )
+
+    def test_not_modified_until_own_data_changes(self):
+        self.add_bill(self.doctor, 1)
+        url = "/api/billing/management/data/"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        # Only the counter lookup runs for a revalidation.
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        self.add_bill(self.other, 2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.add_bill(self.doctor, 3)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 2)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_schedule_rename_changes_patient_vaccine_etag(self):
+        admin = User.objects.create(full_name="Admin", email="admin@test.com", is_staff=True)
+        own = VaccineSchedule.objects.create(user=self.doctor, vaccine="OPV 1", age="6 Weeks")
+        shared = VaccineSchedule.objects.create(user=admin, vaccine="BCG", age="Birth")
+        patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2025, 1, 1))
+        for schedule in (own, shared):
+            PatientVaccine.objects.create(user=self.doctor, patient=patient, vaccine_schedule=schedule, due_date=date(2025, 2, 1))
+        url = "/api/patient/vaccine/"
+
+        for schedule, name in ((own, "OPV 1 (renamed)"), (shared, "BCG (renamed)")):
+            etag = self.client.get(url)["ETag"]
+            schedule.vaccine = name
+            schedule.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(name, [row["vaccine_name"] for row in response.data])
+
+    def test_query_string_gets_its_own_etag(self):
+        self.add_bill(self.doctor, 1)
+        first = self.client.get("/api/billing/management/data/")
+        second = self.client.get("/api/billing/management/data/", {"start_date": "2025-01-01"})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(first["ETag"], second["ETag"])
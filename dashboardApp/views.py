@@ -1,22 +1,32 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from datetime import datetime
 
 from dashboardApp.models import BillingManagement
 from dashboardApp.serializers import BillingManagementSerializers
+from analyticsApp.cache import cached_response
+from dashboardApp.etags import conditional_get
+from timelytots.sparse_fields import requested_fieldset
 
 
 class BillingManagementViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 4}
 
+    @conditional_get("billing")
+    @cached_response("billing")
     def get(self, request):
         try:
-            # Fetch billing records belonging to the logged-in user
-            billing_records = BillingManagement.objects.filter(user=request.user)
+            # Fetch billing records belonging to the logged-in user, loading only the
+            # columns asked for with ?fields= / ?expand=
+            fieldset = requested_fieldset(request)
+            billing_records = BillingManagementSerializers(**fieldset).restrict_queryset(
+                BillingManagement.objects.filter(user=request.user).select_related("user")
+            )
 
             # Filter by start_date and end_date if provided
             start_date = request.query_params.get('start_date')
@@ -43,10 +53,13 @@ class BillingManagementViews(APIView):
                     )
 
             if billing_records.exists():
-                serializer = BillingManagementSerializers(billing_records, many=True)
+                serializer = BillingManagementSerializers(billing_records, many=True, **fieldset)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response({'message': 'No billing record found.'}, status=status.HTTP_204_NO_CONTENT)
 
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -3,8 +3,9 @@ from django.urls import path
 from django.http import HttpResponseRedirect
 from django.contrib import messages
 
-from .models import VaccineSchedule, ReminderLog, FirebaseNotificationLog
+from .models import VaccineSchedule, ReminderLog, FirebaseNotificationLog, SchedulePropagation
 from . import utils 
+from . import tasks
 
 # Register your models here.
 
@@ -46,6 +47,44 @@ class FirebaseNotificationLogAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(SchedulePropagation)
+class SchedulePropagationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "schedule",
+        "status",
+        "processed_patients",
+        "total_patients",
+        "rows_changed",
+        "updated_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = (
+        "schedule",
+        "status",
+        "total_patients",
+        "processed_patients",
+        "rows_changed",
+        "last_patient_id",
+        "error",
+        "created_at",
+        "updated_at",
+        "finished_at",
+    )
+    ordering = ("-created_at",)
+    actions = ["resume_propagations"]
+
+    @admin.action(description="Resume selected propagations")
+    def resume_propagations(self, request, queryset):
+        """Re-queue failed or stalled propagations from where they stopped."""
+        propagation_ids = list(queryset.exclude(status="completed").values_list("id", flat=True))
+        SchedulePropagation.objects.filter(id__in=propagation_ids, status="failed").update(status="running", error=None)
+        for propagation_id in propagation_ids:
+            tasks.propagate_schedule_change.delay(propagation_id)
+        messages.success(request, f"✅ {len(propagation_ids)} propagation(s) re-queued.")
+
+
 @admin.register(ReminderLog)
 class ReminderLogAdmin(admin.ModelAdmin):
     list_display = ("doctor_id","reminder_type", "recipient", "child_name", "doctor_name", "vaccine_name", "due_date", "status", "created_at")
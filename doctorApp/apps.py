@@ -9,4 +9,5 @@ class DoctorappConfig(AppConfig):
     def ready(self):
         # ✅ Import all Celery task modules here safely
         import doctorApp.firebase_utils
-        import doctorApp.utils
\ No newline at end of file
+        import doctorApp.utils
+        import doctorApp.signals
\ No newline at end of file
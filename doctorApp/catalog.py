@@ -0,0 +1,147 @@
+import time
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+from doctorApp.models import VaccineCatalog, VaccineSchedule
+from doctorApp.serializers import VaccineScheduleSerializer
+
+
+logger = logging.getLogger(__name__)
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Serialized global catalog for the latest version this process has seen.
+_process_catalog = {}
+
+# In-process search index over the global catalog, see search_catalog().
+_search_index = {}
+
+
+def get_catalog_version():
+    """Return the current version of the shared vaccine schedule catalog."""
+    catalog, created = VaccineCatalog.objects.get_or_create(id=1)
+    return catalog.version
+
+
+def bump_catalog_version():
+    """Invalidate every patient's synced-at version by moving the catalog forward."""
+    updated = VaccineCatalog.objects.filter(id=1).update(version=F("version") + 1, updated_at=timezone.now())
+    if not updated:
+        VaccineCatalog.objects.get_or_create(id=1, defaults={"version": 2})
+    # Other processes notice the new version within VACCINE_SEARCH_VERSION_CHECK_SECONDS.
+    _search_index.clear()
+
+
+def global_schedule_filter():
+    """Shared schedules every account sees: unowned or added by an admin, not tied to a patient."""
+    return Q(patient__isnull=True) & (Q(user__isnull=True) | Q(user__is_staff=True))
+
+
+def _catalog_key():
+    catalog, created = VaccineCatalog.objects.get_or_create(id=1)
+    # updated_at keeps keys unique even if a version number is ever reused (e.g. a restored database).
+    return f"vaccine_catalog:{catalog.version}:{catalog.updated_at.timestamp():.6f}"
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning("Catalog cache read failed: %s", e)
+        return None
+
+
+def _cache_set(key, value):
+    try:
+        cache.set(key, value, CATALOG_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning("Catalog cache write failed: %s", e)
+
+
+def get_global_schedules():
+    """
+    Serialized global catalog, cached in this process and in Redis under the
+    current catalog version. Any shared schedule write bumps the version, so
+    stale entries are never read and simply expire.
+    """
+    key = _catalog_key()
+    if key in _process_catalog:
+        return _process_catalog[key]
+
+    schedules = _cache_get(key)
+    if schedules is None:
+        queryset = VaccineSchedule.objects.filter(global_schedule_filter()) \
+            .select_related("user").order_by("age_order", "id")
+        schedules = [dict(row) for row in VaccineScheduleSerializer(queryset, many=True).data]
+        _cache_set(key, schedules)
+
+    _process_catalog.clear()
+    _process_catalog[key] = schedules
+    return schedules
+
+
+class CatalogSearchIndex:
+    """
+    Edge n-gram index over the distinct (vaccine, age) pairs of the global
+    catalog. Every prefix of every word maps to the entries containing it,
+    so a typeahead query is a few set intersections.
+    """
+    max_gram = 12
+
+    def __init__(self, schedules):
+        self.entries = sorted({(row["vaccine"], row["age"] or "") for row in schedules},
+                              key=lambda entry: (entry[0].lower(), entry[1]))
+        self.grams = defaultdict(set)
+        for position, (vaccine, age) in enumerate(self.entries):
+            for word in f"{vaccine} {age}".lower().split():
+                for size in range(1, min(len(word), self.max_gram) + 1):
+                    self.grams[word[:size]].add(position)
+
+    def search(self, query, limit=10):
+        terms = query.lower().split()
+        if not terms:
+            return []
+
+        matches = None
+        for term in terms:
+            found = self.grams.get(term[:self.max_gram], set())
+            if len(term) > self.max_gram:
+                found = {position for position in found if self._has_word_prefix(position, term)}
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+
+        query = " ".join(terms)
+        # Names starting with the whole query first, then catalog order.
+        ranked = sorted(matches, key=lambda position: (not self.entries[position][0].lower().startswith(query), position))
+        return [{"vaccine": self.entries[position][0], "age": self.entries[position][1] or None}
+                for position in ranked[:limit]]
+
+    def _has_word_prefix(self, position, term):
+        vaccine, age = self.entries[position]
+        return any(word.startswith(term) for word in f"{vaccine} {age}".lower().split())
+
+
+def search_catalog(query, limit=10):
+    """
+    Typeahead over catalog vaccine names and ages from the in-process index.
+    The catalog version is re-read at most every VACCINE_SEARCH_VERSION_CHECK_SECONDS,
+    so most searches never touch the database.
+    """
+    check_every = getattr(settings, "VACCINE_SEARCH_VERSION_CHECK_SECONDS", 30)
+    now = time.monotonic()
+
+    # (catalog key, checked at, index), swapped as a whole so concurrent readers never see a partial state.
+    state = _search_index.get("state")
+    if state is None or now - state[1] > check_every:
+        key = _catalog_key()
+        index = state[2] if state and state[0] == key else CatalogSearchIndex(get_global_schedules())
+        state = (key, now, index)
+        _search_index["state"] = state
+
+    return state[2].search(query, limit)
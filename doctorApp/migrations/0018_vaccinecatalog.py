@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0017_vaccineschedule_age_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VaccineCatalog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Vaccine Catalog',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:02
+
+from django.db import migrations, models
+
+
+AGE_OFFSET_DAYS = {
+    "Birth": 0, "6 Weeks": 42, "10 Weeks": 70, "14 Weeks": 98,
+    "6 Months": 183, "7 Months": 213, "9 Months": 274,
+    "12 Months": 365, "15 Months": 456, "16–18 Months": 548,
+    "18 Months": 548, "2 Years": 730, "3 Years": 1095,
+    "4 Years": 1460, "4–6 Years": 2190, "5 Years": 1825,
+    "6 Years": 2190, "7 Years": 2555, "8 Years": 2920,
+    "10 Years": 3650, "16–18 Years": 6570,
+}
+
+
+def populate_offset_days(apps, schema_editor):
+    VaccineSchedule = apps.get_model("doctorApp", "VaccineSchedule")
+    for age, days in AGE_OFFSET_DAYS.items():
+        VaccineSchedule.objects.filter(age=age).update(offset_days=days)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0018_vaccinecatalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccineschedule',
+            name='offset_days',
+            field=models.PositiveIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(populate_offset_days, migrations.RunPython.noop),
+    ]
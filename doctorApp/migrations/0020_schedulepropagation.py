@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0019_vaccineschedule_offset_days'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulePropagation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_patients', models.PositiveIntegerField(default=0)),
+                ('processed_patients', models.PositiveIntegerField(default=0)),
+                ('rows_changed', models.PositiveIntegerField(default=0)),
+                ('last_patient_id', models.PositiveBigIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='propagations', to='doctorApp.vaccineschedule')),
+            ],
+            options={
+                'verbose_name_plural': 'Schedule Propagations',
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='doctorApp_s_status_e188fe_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticationApp', '0005_delta_sync'),
+        ('doctorApp', '0020_schedulepropagation'),
+        ('patientApp', '0007_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vaccineschedule',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='vaccineschedule',
+            index=models.Index(fields=['updated_at', 'id'], name='doctorApp_v_updated_2a3cb8_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_doctor_user(apps, schema_editor):
+    # One set-based UPDATE: only numeric doctor_id values naming an existing account are linked.
+    ReminderLog = apps.get_model("doctorApp", "ReminderLog")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f"""
+        UPDATE {quote(ReminderLog._meta.db_table)} AS log
+        SET doctor_user_id = u.id
+        FROM {quote(User._meta.db_table)} AS u
+        WHERE log.doctor_id ~ '^[0-9]{{1,18}}$' AND u.id = log.doctor_id::bigint
+        """
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0021_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderlog',
+            name='doctor_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reminder_logs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_doctor_user, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reminderlog',
+            index=models.Index(fields=['doctor_user', 'status', 'created_at'], name='reminderlog_doctor_sent_idx'),
+        ),
+    ]
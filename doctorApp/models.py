@@ -30,6 +30,31 @@ class VaccineSchedule(models.Model):
         TEN_YEARS = "10 Years", "10 Years"
         SIXTEEN_EIGHTEEN_YEARS = "16–18 Years", "16–18 Years"
 
+    # Days after date of birth each age falls due; every AgeChoices entry must be listed.
+    AGE_OFFSET_DAYS = {
+        AgeChoices.BIRTH: 0,
+        AgeChoices.SIX_WEEKS: 42,
+        AgeChoices.TEN_WEEKS: 70,
+        AgeChoices.FOURTEEN_WEEKS: 98,
+        AgeChoices.SIX_MONTHS: 183,
+        AgeChoices.SEVEN_MONTHS: 213,
+        AgeChoices.NINE_MONTHS: 274,
+        AgeChoices.TWELVE_MONTHS: 365,
+        AgeChoices.FIFTEEN_MONTHS: 456,
+        AgeChoices.SIXTEEN_EIGHTEEN_MONTHS: 548,
+        AgeChoices.EIGHTEEN_MONTHS: 548,
+        AgeChoices.TWO_YEARS: 730,
+        AgeChoices.THREE_YEARS: 1095,
+        AgeChoices.FOUR_YEARS: 1460,
+        AgeChoices.FOUR_SIX_YEARS: 2190,
+        AgeChoices.FIVE_YEARS: 1825,
+        AgeChoices.SIX_YEARS: 2190,
+        AgeChoices.SEVEN_YEARS: 2555,
+        AgeChoices.EIGHT_YEARS: 2920,
+        AgeChoices.TEN_YEARS: 3650,
+        AgeChoices.SIXTEEN_EIGHTEEN_YEARS: 6570,
+    }
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
 
     ACCOUNT_TYPE_CHOICES = [
@@ -56,12 +81,27 @@ class VaccineSchedule(models.Model):
     )
     age = models.CharField(max_length=20, choices=AgeChoices.choices, blank=True, null=True)
     age_order = models.PositiveIntegerField(default=0)
+    offset_days = models.PositiveIntegerField(blank=True, null=True, db_index=True)
 
 
     due_date = models.DateField(blank=True, null=True)
 
     vaccine = models.CharField(max_length=150)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync: schedules changed since a point in time.
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
+    def save(self, *args, **kwargs):
+        self.offset_days = self.AGE_OFFSET_DAYS.get(self.age)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "age" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "offset_days"}
+        super().save(*args, **kwargs)
+
     # def __str__(self):
     #     return f"{self.age} → {self.vaccine}"
     
@@ -71,11 +111,25 @@ class VaccineSchedule(models.Model):
         return f"{age_display} → {self.vaccine} (Added by: {added_by})"
 
 
+class VaccineCatalog(models.Model):
+    """Single-row version stamp, bumped whenever the shared schedule catalog changes."""
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'Vaccine Catalog'
+
+    def __str__(self):
+        return f"Vaccine catalog v{self.version}"
+
+
 class ReminderLog(models.Model):
     reminder_type = models.CharField(max_length=50, default="vaccination")
     recipient = models.CharField(max_length=20)  # mobile/email
     child_name = models.CharField(max_length=500, blank=True, null=True)
     doctor_id = models.CharField(max_length=500, blank=True, null=True)
+    # Indexed reference to the same doctor; doctor_id above is kept as sent.
+    doctor_user = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, related_name="reminder_logs")
     doctor_name = models.CharField(max_length=500, blank=True, null=True)
     vaccine_name = models.CharField(max_length=500, blank=True, null=True)
     due_date = models.DateField(blank=True, null=True)
@@ -83,6 +137,12 @@ class ReminderLog(models.Model):
     response = models.JSONField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Per-doctor message counts for a period (analytics, billing).
+            models.Index(fields=['doctor_user', 'status', 'created_at'], name='reminderlog_doctor_sent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.recipient} - {self.reminder_type} ({self.status})"
 
@@ -103,4 +163,36 @@ class FirebaseNotificationLog(models.Model):
         ordering = ["-created_at"]
 
     def __str__(self):
-        return f"DoctorID: {self.doctor_id or '-'} | PatientID: {self.patient_id or '-'} | {self.status}"
\ No newline at end of file
+        return f"DoctorID: {self.doctor_id or '-'} | PatientID: {self.patient_id or '-'} | {self.status}"
+
+
+class SchedulePropagation(models.Model):
+    """Progress of applying one catalog change to existing patients, resumable from last_patient_id."""
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    schedule = models.ForeignKey(VaccineSchedule, on_delete=models.CASCADE, related_name="propagations")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+
+    total_patients = models.PositiveIntegerField(default=0)
+    processed_patients = models.PositiveIntegerField(default=0)
+    rows_changed = models.PositiveIntegerField(default=0)
+    last_patient_id = models.PositiveBigIntegerField(default=0)
+
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+        verbose_name_plural = 'Schedule Propagations'
+
+    def __str__(self):
+        return f"{self.schedule_id} ({self.status}: {self.processed_patients}/{self.total_patients})"
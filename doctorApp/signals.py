@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from doctorApp.catalog import bump_catalog_version
+from doctorApp.models import VaccineSchedule
+from doctorApp.tasks import queue_schedule_propagation
+from patientApp.models import Patient
+
+
+# --- Signal: Keep patient syncs in step with the schedule catalog ---
+@receiver([post_save, post_delete], sender=VaccineSchedule)
+def track_catalog_change(sender, instance, **kwargs):
+    if instance.patient_id:
+        # Patient-specific schedule: only that patient needs a re-sync.
+        Patient.objects.filter(id=instance.patient_id).update(schedule_version=0)
+    else:
+        bump_catalog_version()
+
+
+# --- Signal: Push shared schedule adds/edits to existing patients in the background ---
+# Deletes need no propagation: PatientVaccine rows cascade with the schedule.
+@receiver(post_save, sender=VaccineSchedule)
+def propagate_catalog_change(sender, instance, **kwargs):
+    if not instance.patient_id:
+        queue_schedule_propagation(instance)
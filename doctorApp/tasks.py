@@ -0,0 +1,146 @@
+import time
+import logging
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from doctorApp.models import SchedulePropagation
+from patientApp.models import Patient
+from patientApp.utils import expand_patient_vaccines, refresh_due_dates
+from timelytots.query_budget import query_budget
+
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["pending", "running"]
+
+
+def affected_patients(schedule):
+    """Patients a shared schedule applies to: everyone for admin entries, else the owner's patients."""
+    if schedule.user_id is None or schedule.user.is_staff:
+        return Patient.objects.all()
+    return Patient.objects.filter(user_id=schedule.user_id)
+
+
+def _enqueue(propagation_id):
+    try:
+        propagate_schedule_change.delay(propagation_id)
+    except Exception as e:
+        # The row stays pending and is picked up by resume_schedule_propagations.
+        logger.exception("Could not queue schedule propagation %s: %s", propagation_id, e)
+
+
+def queue_schedule_propagation(schedule):
+    """Start (or restart from the first patient) propagating a catalog schedule once the write commits."""
+    propagation = SchedulePropagation.objects.filter(schedule=schedule, status__in=ACTIVE_STATUSES).first()
+    if propagation:
+        propagation.status = "pending"
+        propagation.last_patient_id = 0
+        propagation.processed_patients = 0
+        propagation.rows_changed = 0
+        propagation.save()
+    else:
+        propagation = SchedulePropagation.objects.create(schedule=schedule)
+
+    transaction.on_commit(lambda: _enqueue(propagation.id))
+    return propagation
+
+
+# --------------------------
+# Celery Tasks
+# --------------------------
+@shared_task(bind=True)
+def propagate_schedule_change(self, propagation_id):
+    """
+    Apply a shared schedule change to existing patients in batches of
+    SCHEDULE_PROPAGATION_BATCH_SIZE patients, ordered by id.
+
+    Each batch is one INSERT ... SELECT plus one UPDATE, committed together
+    with the cursor so the job can resume where it stopped. The task sleeps
+    between batches and hands over to a fresh task once its time budget is
+    used up.
+    """
+    batch_size = getattr(settings, "SCHEDULE_PROPAGATION_BATCH_SIZE", 500)
+    throttle = getattr(settings, "SCHEDULE_PROPAGATION_THROTTLE", 0.2)
+    time_budget = getattr(settings, "SCHEDULE_PROPAGATION_TIME_BUDGET", 240)
+    started = time.monotonic()
+
+    while True:
+        try:
+            with transaction.atomic():
+                propagation = (
+                    SchedulePropagation.objects.select_for_update(skip_locked=True, of=("self",))
+                    .select_related("schedule__user")
+                    .filter(id=propagation_id, status__in=ACTIVE_STATUSES)
+                    .first()
+                )
+                if propagation is None:
+                    # Finished, schedule deleted, or another worker holds it.
+                    return "Nothing to propagate."
+
+                patients = affected_patients(propagation.schedule)
+                if propagation.status == "pending":
+                    propagation.status = "running"
+                    propagation.total_patients = patients.count()
+
+                patient_ids = list(
+                    patients.filter(id__gt=propagation.last_patient_id)
+                    .order_by("id")
+                    .values_list("id", flat=True)[:batch_size]
+                )
+
+                if not patient_ids:
+                    propagation.status = "completed"
+                    propagation.finished_at = timezone.now()
+                    propagation.save()
+                    logger.info("Schedule propagation %s completed: %s rows changed.",
+                                propagation_id, propagation.rows_changed)
+                    return "Schedule propagation completed."
+
+                schedule_ids = [propagation.schedule_id]
+                changed = expand_patient_vaccines(patient_ids, schedule_ids=schedule_ids)
+                changed += refresh_due_dates(patient_ids=patient_ids, schedule_ids=schedule_ids)
+
+                propagation.last_patient_id = patient_ids[-1]
+                propagation.processed_patients += len(patient_ids)
+                propagation.rows_changed += changed
+                propagation.save()
+
+        except Exception as e:
+            logger.exception("Schedule propagation %s failed: %s", propagation_id, e)
+            SchedulePropagation.objects.filter(id=propagation_id).update(
+                status="failed", error=str(e), updated_at=timezone.now()
+            )
+            return "Schedule propagation failed."
+
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta={
+                "processed_patients": propagation.processed_patients,
+                "total_patients": propagation.total_patients,
+                "rows_changed": propagation.rows_changed,
+            })
+
+        if time.monotonic() - started > time_budget:
+            _enqueue(propagation_id)
+            return "Schedule propagation continues in a new task."
+
+        time.sleep(throttle)
+
+
+@shared_task
+@query_budget(1)
+def resume_schedule_propagations():
+    """Re-queue propagations whose worker died or whose task never reached the broker."""
+    stale_before = timezone.now() - timedelta(minutes=10)
+    propagation_ids = list(
+        SchedulePropagation.objects.filter(status__in=ACTIVE_STATUSES, updated_at__lt=stale_before)
+        .values_list("id", flat=True)
+    )
+
+    for propagation_id in propagation_ids:
+        _enqueue(propagation_id)
+
+    return f"Resumed {len(propagation_ids)} schedule propagations."
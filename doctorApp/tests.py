@@ -1,10 +1,15 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from unittest.mock import patch
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta, date
 from authenticationApp.models import User
 from patientApp.models import Patient, VaccineSchedule, PatientVaccine
 from doctorApp.firebase_utils import send_missed_vaccine_notifications
+from doctorApp.models import SchedulePropagation
+from doctorApp.tasks import propagate_schedule_change
 
 
 class MissedVaccineNotificationTest(TestCase):
@@ -78,3 +83,91 @@ class MissedVaccineNotificationTest(TestCase):
         self.assertIn("vaccine_names", data)
 
         print("✅ Test passed — Firebase called with correct data and body.")
+
+
+@override_settings(SCHEDULE_PROPAGATION_BATCH_SIZE=2, SCHEDULE_PROPAGATION_THROTTLE=0)
+class SchedulePropagationTest(TestCase):
+    """Tests for propagating admin schedule changes to existing patients"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.patients = [
+            Patient.objects.create(
+                user=self.doctor,
+                child_name=f"Child {i}",
+                mobile_number="8708559274",
+                date_of_birth=date.today() - timedelta(days=30)
+            )
+            for i in range(5)
+        ]
+
+    def test_new_schedule_reaches_every_patient(self):
+        schedule = VaccineSchedule.objects.create(user=self.admin, vaccine="OPV 1", age="6 Weeks")
+        propagation = SchedulePropagation.objects.get(schedule=schedule)
+
+        self.assertEqual(propagate_schedule_change(propagation.id), "Schedule propagation completed.")
+
+        propagation.refresh_from_db()
+        self.assertEqual(propagation.status, "completed")
+        self.assertEqual(propagation.processed_patients, 5)
+        self.assertEqual(PatientVaccine.objects.filter(vaccine_schedule=schedule, status="Upcoming").count(), 5)
+
+    def test_age_change_updates_due_dates(self):
+        schedule = VaccineSchedule.objects.create(user=self.admin, vaccine="OPV 1", age="6 Weeks")
+        propagate_schedule_change(SchedulePropagation.objects.get(schedule=schedule).id)
+
+        schedule.age = "10 Weeks"
+        schedule.save()
+        propagation = SchedulePropagation.objects.filter(schedule=schedule, status="pending").get()
+        propagate_schedule_change(propagation.id)
+
+        propagation.refresh_from_db()
+        self.assertEqual(propagation.rows_changed, 5)
+        for vaccine in PatientVaccine.objects.filter(vaccine_schedule=schedule).select_related("patient"):
+            self.assertEqual(vaccine.due_date, vaccine.patient.date_of_birth + timedelta(days=70))
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class VaccineScheduleQueryBudgetTest(TestCase):
+    """The schedule catalog endpoint stays within its query budget"""
+
+    def test_catalog_list_within_budget(self):
+        admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        for i in range(30):
+            VaccineSchedule.objects.create(user=admin if i % 3 else doctor, vaccine=f"Vaccine {i}", age="6 Weeks")
+
+        # A real token, so the user load counts, and a cold catalog cache.
+        cache.clear()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(doctor).access_token}")
+        response = client.get("/api/vaccine/schedule/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 30)
+
+
+class VaccineCatalogCacheTest(TestCase):
+    """The global schedule catalog is served from the version-keyed cache"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        VaccineSchedule.objects.create(user=self.admin, vaccine="BCG", age="Birth")
+        VaccineSchedule.objects.create(user=self.doctor, vaccine="Doctor's own", age="6 Weeks")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def vaccines(self):
+        return [row["vaccine"] for row in self.client.get("/api/vaccine/schedule/").data]
+
+    def test_catalog_is_cached_until_a_write(self):
+        self.assertEqual(self.vaccines(), ["BCG", "Doctor's own"])
+
+        # Warm cache: the ETag versions, the catalog version row and the caller's own schedules only.
+        with self.assertNumQueries(3):
+            self.client.get("/api/vaccine/schedule/")
+
+        VaccineSchedule.objects.create(user=self.admin, vaccine="OPV 1", age="6 Weeks")
+        self.assertEqual(self.vaccines(), ["BCG", "OPV 1", "Doctor's own"])
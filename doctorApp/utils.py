@@ -220,6 +220,7 @@ def send_vaccination_reminders():
             child_name=child_name,
             doctor_name=doctor_name,
             doctor_id=str(doctor_id),
+            doctor_user=patient_vaccines[0].user,
             vaccine_name=vaccine_names,
             due_date=due_date,
             status=status,
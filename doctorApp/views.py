@@ -4,6 +4,8 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import models
 from authenticationApp.models import ClinicDoctor
 from doctorApp.models import VaccineSchedule, ReminderLog
+from doctorApp.catalog import get_global_schedules, global_schedule_filter
+from dashboardApp.etags import conditional_get
 from doctorApp.serializers import ClinicDoctorSerializers, VaccineScheduleSerializer, CustomVaccineScheduleSerializer
 from rest_framework import status
 from rest_framework.response import Response
@@ -118,13 +120,15 @@ class DoctorMarkInactive(APIView):
 class VaccineScheduleViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 5}
 
+    @conditional_get("schedules")
     def get(self, request):
-        schedules = VaccineSchedule.objects.filter(
-            models.Q(user__isnull=True) | models.Q(user=request.user) | models.Q(user__is_staff=True)
-        )
-        serializer = VaccineScheduleSerializer(schedules, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Admin catalog comes from the version-keyed cache; only the caller's own schedules are queried.
+        own_schedules = VaccineSchedule.objects.filter(user=request.user).exclude(global_schedule_filter()) \
+            .select_related("user").order_by("age_order", "id")
+        serializer = VaccineScheduleSerializer(own_schedules, many=True)
+        return Response([*get_global_schedules(), *serializer.data], status=status.HTTP_200_OK)
 
     def post(self, request):
         if request.user.account_type not in ["doctor", "clinic"]:
@@ -413,9 +417,14 @@ class VaccineReminderAPIView(APIView):
                 if response.status_code == 200:
                     messages_sent += 1
                     ReminderLog.objects.create(
-                        user=vaccine.patient.user,
-                        patient_name=child_name,
-                        vaccine_name=vaccine_names
+                        recipient=phone_number,
+                        child_name=child_name,
+                        doctor_id=str(vaccine.patient.user_id),
+                        doctor_user=vaccine.patient.user,
+                        doctor_name=doctor_name,
+                        vaccine_name=vaccine_names,
+                        due_date=vaccine.due_date,
+                        status="success",
                     )
 
 
@@ -0,0 +1,179 @@
+import csv
+import json
+import codecs
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from analyticsApp.rollups import added_bucket, apply_deltas, patient_bucket
+from authenticationApp.models import ClinicDoctor
+from dashboardApp.etags import bump_data_version
+from doctorApp.catalog import get_catalog_version
+from patientApp.models import Patient
+from patientApp.serializers import PatientImportSerializer
+from patientApp.tasks import send_welcome_messages
+from patientApp.utils import expand_patient_vaccines
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImportFormatError(ValueError):
+    """The upload as a whole could not be read."""
+
+
+def iter_import_rows(request):
+    """
+    Yield raw patient rows from the request without loading uploads whole:
+    a CSV or JSON Lines file sent as 'file', or a JSON list in the body
+    (bare or under "patients").
+    """
+    upload = request.FILES.get("file")
+    if upload is None:
+        rows = request.data.get("patients") if hasattr(request.data, "get") else request.data
+        if not isinstance(rows, list):
+            raise ImportFormatError("Send a CSV or JSON Lines file as 'file', or a JSON list of patients.")
+        yield from rows
+        return
+
+    lines = codecs.iterdecode(upload, "utf-8-sig")
+    if upload.name.lower().endswith((".jsonl", ".ndjson")):
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    else:
+        for row in csv.DictReader(lines):
+            # Blank cells count as missing so optional columns can be left empty.
+            yield {
+                key.strip(): value.strip()
+                for key, value in row.items()
+                if key and value is not None and value.strip()
+            }
+
+
+def _duplicate_key(child_name, date_of_birth, mobile_number):
+    return child_name.strip().lower(), date_of_birth, mobile_number
+
+
+def _queue_welcome_messages(patient_ids, countdown):
+    try:
+        send_welcome_messages.apply_async(args=[patient_ids], countdown=countdown)
+    except Exception as e:
+        logger.exception("Could not queue welcome messages for %s imported patients: %s", len(patient_ids), e)
+
+
+def import_patients(user, rows, send_welcome=True):
+    """
+    Validate and insert patients for a doctor or clinic in batched transactions.
+
+    Each batch inserts its patients with one bulk INSERT and their vaccine
+    schedules with one INSERT ... SELECT. Rows that fail validation or that
+    match an active patient (same name, date of birth and mobile number,
+    in the database or earlier in the file) are reported and skipped.
+    Welcome WhatsApp messages are handed to a paced Celery task instead of
+    being sent inline.
+    """
+    batch_size = getattr(settings, "PATIENT_IMPORT_BATCH_SIZE", 500)
+    max_rows = getattr(settings, "PATIENT_IMPORT_MAX_ROWS", 20000)
+    welcome_rate = getattr(settings, "WELCOME_MESSAGES_PER_SECOND", 5)
+
+    context = {
+        "user": user,
+        "clinic_doctors": dict(ClinicDoctor.objects.filter(clinic=user).values_list("id", "is_active")),
+    }
+    # One serializer validates every row; building a fresh one per row
+    # deep-copies its fields each time and dominates large imports.
+    validator = PatientImportSerializer(context=context)
+    catalog_version = get_catalog_version()
+    seen = set()
+    report = {"total_rows": 0, "created": 0, "duplicates": 0, "failed": 0, "errors": []}
+    batch = []
+
+    def flush():
+        # Duplicates already in the database, one query per batch.
+        existing = {
+            _duplicate_key(*values)
+            for values in Patient.objects.filter(
+                user=user,
+                is_active=True,
+                mobile_number__in={data["mobile_number"] for _, data in batch},
+            ).values_list("child_name", "date_of_birth", "mobile_number")
+        }
+
+        patients = []
+        for row_number, data in batch:
+            if _duplicate_key(data["child_name"], data["date_of_birth"], data["mobile_number"]) in existing:
+                report["duplicates"] += 1
+                report["errors"].append({"row": row_number, "errors": ["patient already exists!."]})
+                continue
+            patients.append(Patient(
+                user=user,
+                doctor_id=data.get("doctor"),
+                child_name=data["child_name"],
+                date_of_birth=data["date_of_birth"],
+                mobile_number=data["mobile_number"],
+                gender=data["gender"],
+                schedule_version=catalog_version,
+            ))
+        batch.clear()
+
+        if not patients:
+            return
+
+        with transaction.atomic():
+            Patient.objects.bulk_create(patients)
+            bump_data_version("patients", [user.id])
+            deltas = Counter()
+            for patient in patients:
+                deltas.update([patient_bucket(user.id, patient.created_at, True), added_bucket(user.id, patient.created_at)])
+            apply_deltas(deltas)
+            patient_ids = [patient.id for patient in patients]
+            # Vaccines already due before registration were given elsewhere.
+            expand_patient_vaccines(patient_ids, completed_at="Other Private Hospital")
+            if send_welcome:
+                # Stagger batches so parallel workers keep the overall pace.
+                countdown = report["created"] / welcome_rate
+                transaction.on_commit(lambda: _queue_welcome_messages(patient_ids, countdown))
+
+        report["created"] += len(patients)
+
+    for row_number, row in enumerate(rows, start=1):
+        if row_number > max_rows:
+            report["errors"].append({"row": row_number, "errors": [f"Imports are limited to {max_rows} rows; the rest of the file was skipped."]})
+            break
+        report["total_rows"] += 1
+
+        if not isinstance(row, dict):
+            report["failed"] += 1
+            report["errors"].append({"row": row_number, "errors": ["Row must be an object with patient fields."]})
+            continue
+
+        try:
+            data = validator.run_validation(row)
+        except ValidationError as e:
+            report["failed"] += 1
+            report["errors"].append({"row": row_number, "errors": e.detail})
+            continue
+
+        key = _duplicate_key(data["child_name"], data["date_of_birth"], data["mobile_number"])
+        if key in seen:
+            report["duplicates"] += 1
+            report["errors"].append({"row": row_number, "errors": ["Duplicate of an earlier row in this file."]})
+            continue
+        seen.add(key)
+
+        batch.append((row_number, data))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    return report
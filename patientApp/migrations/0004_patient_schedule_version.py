@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patientApp', '0003_patientvaccine_notification_sent_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='schedule_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
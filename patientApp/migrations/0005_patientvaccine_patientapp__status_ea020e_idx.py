@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0020_schedulepropagation'),
+        ('patientApp', '0004_patient_schedule_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientvaccine',
+            index=models.Index(fields=['status', 'due_date'], name='patientApp__status_ea020e_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:16
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticationApp', '0004_passwordresetcode'),
+        ('patientApp', '0005_patientvaccine_patientapp__status_ea020e_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_name',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.text.Lower('child_name'), output_field=models.CharField(max_length=255)),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['user', 'search_name'], name='patient_search_name_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['user', 'mobile_number'], name='patient_search_mobile_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticationApp', '0004_passwordresetcode'),
+        ('doctorApp', '0020_schedulepropagation'),
+        ('patientApp', '0006_patient_search_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['user', 'id'], name='patientApp__user_id_6095f0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientvaccine',
+            index=models.Index(fields=['user', 'due_date', 'id'], name='patientApp__user_id_c19c66_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authenticationApp', '0005_delta_sync'),
+        ('doctorApp', '0021_delta_sync'),
+        ('patientApp', '0007_keyset_pagination_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='patientvaccine',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='patientApp__user_id_7a54f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientvaccine',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='patientApp__user_id_ca9cb5_idx'),
+        ),
+    ]
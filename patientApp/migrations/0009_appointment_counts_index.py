@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctorApp', '0021_delta_sync'),
+        ('patientApp', '0008_delta_sync'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patientvaccine',
+            index=models.Index(fields=['user', 'status', 'is_completed', 'due_date'], include=('patient',), name='patientvaccine_counts_idx'),
+        ),
+    ]
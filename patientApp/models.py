@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import RegexValidator
 from authenticationApp.models import User, ClinicDoctor
 from doctorApp.models import VaccineSchedule
@@ -26,12 +27,31 @@ class Patient(models.Model):
 
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by bulk updates, which bypass auto_now.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # VaccineCatalog version this patient's vaccines were last synced against.
+    schedule_version = models.PositiveIntegerField(default=0)
+
+    # Lower-cased name maintained by the database, used for indexed prefix search.
+    search_name = models.GeneratedField(
+        expression=Lower("child_name"),
+        output_field=models.CharField(max_length=255),
+        db_persist=True,
+    )
 
     class Meta:
         indexes = [
             models.Index(fields=['user', 'child_name', 'date_of_birth']),
             models.Index(fields=['mobile_number', 'gender']),
             models.Index(fields=['is_active', 'created_at']),
+            # Prefix (LIKE 'term%') search within a doctor's or clinic's patients.
+            models.Index(fields=['user', 'search_name'], opclasses=['int8_ops', 'varchar_pattern_ops'], name='patient_search_name_idx'),
+            models.Index(fields=['user', 'mobile_number'], opclasses=['int8_ops', 'varchar_pattern_ops'], name='patient_search_mobile_idx'),
+            # Keyset pagination on ('-id',) within a doctor's or clinic's patients.
+            models.Index(fields=['user', 'id']),
+            # Delta sync: patients changed since a point in time.
+            models.Index(fields=['user', 'updated_at', 'id']),
         ]
 
         verbose_name_plural = 'Patient'
@@ -67,6 +87,8 @@ class PatientVaccine(models.Model):
     completed_at = models.CharField(max_length=50, choices=COMPLETION_SOURCE, null=True, blank=True)
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set explicitly by bulk updates, which bypass auto_now.
+    updated_at = models.DateTimeField(auto_now=True)
 
     notification_sent = models.BooleanField(default=False)
     notification_sent_at = models.DateTimeField(null=True, blank=True)
@@ -77,6 +99,14 @@ class PatientVaccine(models.Model):
             models.Index(fields=['vaccine_schedule', 'status']),
             models.Index(fields=['is_completed', 'completed_on', 'custom_vaccine']),
             models.Index(fields=['completed_at', 'due_date', 'created_at']),
+            models.Index(fields=['status', 'due_date']),
+            # Keyset pagination on (due_date, id) within an account's vaccines.
+            models.Index(fields=['user', 'due_date', 'id']),
+            # Delta sync: vaccines changed since a point in time.
+            models.Index(fields=['user', 'updated_at', 'id']),
+            # Dashboard counters: index-only scan of an account's open vaccines.
+            models.Index(fields=['user', 'status', 'is_completed', 'due_date'], include=['patient'],
+                         name='patientvaccine_counts_idx'),
         ]
 
         verbose_name_plural = 'Patient Vaccine'
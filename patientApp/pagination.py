@@ -0,0 +1,127 @@
+import json
+import base64
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """Row estimate from the planner: constant time, unlike COUNT(*)."""
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique composite ordering such as ('-id',) or
+    ('due_date', 'id'). Each page is a single indexed range read of
+    limit + 1 rows, however deep the client scrolls.
+
+    ?count=exact adds a COUNT(*), ?count=estimate the planner's estimate;
+    by default no count is run. Nullable keys follow PostgreSQL ordering
+    (NULLs last ascending, first descending).
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def __init__(self, ordering=('-id',)):
+        self.ordering = ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        model = queryset.model
+        self.keys = [
+            (model._meta.get_field(key.lstrip('-')), key.startswith('-'))
+            for key in self.ordering
+        ]
+
+        self.count = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.count()
+        elif count_mode == 'estimate':
+            self.count = estimate_count(queryset)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.is_first_page = position is None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def after(self, position):
+        """Q matching rows strictly after `position` in the ordering."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.keys, position):
+            name = field.name
+            if value is None:
+                # NULLs sort last ascending and first descending.
+                beyond = Q(**{f'{name}__isnull': False}) if descending else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if not descending and field.null:
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def encode_cursor(self, obj):
+        values = [field.value_to_string(obj) if getattr(obj, field.attname) is not None else None
+                  for field, _ in self.keys]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.keys):
+                raise ValueError
+            return [None if value is None else field.to_python(value)
+                    for (field, _), value in zip(self.keys, values)]
+        except Exception:
+            raise NotFound('Invalid cursor.')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response = {'count': self.count, **response}
+        return Response(response)
+
+
+def wants_keyset(request):
+    """Keyset pagination is opt-in: clients send ?cursor= (empty for the first page)."""
+    return KeysetPagination.cursor_query_param in request.query_params
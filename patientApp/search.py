@@ -0,0 +1,57 @@
+from django.db.models import Case, IntegerField, Value, When
+
+from patientApp.models import Patient
+
+
+def normalize_query(query):
+    """Lower-case the query and collapse whitespace, matching Patient.search_name."""
+    return " ".join(query.lower().split())
+
+
+def _ranked_tiers(user, term):
+    """
+    Querysets for each match tier, best first. Phone and name-prefix tiers
+    are answered from the (user, ... varchar_pattern_ops) indexes; matches
+    on a later word of the name are only read when earlier tiers run out.
+    """
+    patients = Patient.objects.filter(user=user)
+
+    digits = term.replace(" ", "")
+    if digits.isdigit():
+        return [patients.filter(mobile_number__startswith=digits).order_by("mobile_number", "id")]
+
+    name_prefix = patients.filter(search_name__startswith=term).annotate(
+        rank=Case(When(search_name=term, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by("rank", "search_name", "id")
+    word_prefix = patients.filter(search_name__contains=f" {term}").exclude(
+        search_name__startswith=term
+    ).order_by("search_name", "id")
+    return [name_prefix, word_prefix]
+
+
+def search_patients(user, query, limit=20, offset=0):
+    """
+    Ranked patient search for typeahead: exact name, then name prefix, then
+    prefix of a later word in the name; digit-only queries match mobile
+    number prefixes. Returns (patients, has_more).
+    """
+    term = normalize_query(query)
+    if not term:
+        return [], False
+
+    wanted = limit + 1
+    skip = offset
+    results = []
+    for tier in _ranked_tiers(user, term):
+        if len(results) >= wanted:
+            break
+        if skip:
+            # Only deep pages pay for counting the tiers they skip over.
+            size = tier.count()
+            if skip >= size:
+                skip -= size
+                continue
+        results.extend(tier[skip:skip + wanted - len(results)])
+        skip = 0
+
+    return results[:limit], len(results) > limit
@@ -1,12 +1,15 @@
 from rest_framework import serializers
 
 from authenticationApp.models import User, ClinicDoctor
+from authenticationApp.serializers import ClinicDoctorSerializer
 from doctorApp.models import VaccineSchedule
 from patientApp.models import Patient, PatientVaccine
+from patientApp.utils import sync_patient_vaccines, refresh_due_dates
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
+from timelytots.sparse_fields import SparseFieldsMixin
 
 
 class PatientVaccineSerializer(serializers.ModelSerializer):
@@ -40,9 +43,12 @@ class PatientVaccineSerializer(serializers.ModelSerializer):
         ]
         
     def get_added_by(self, obj):
-        if obj.vaccine_schedule and obj.vaccine_schedule.user.is_staff:
+        schedule = obj.vaccine_schedule
+        if schedule is None:
+            return "Unknown"
+        if schedule.user is None or schedule.user.is_staff:
             return "Admin"
-        return getattr(obj.vaccine_schedule.user, "full_name", None) or obj.vaccine_schedule.user.email or "Unknown"
+        return schedule.user.full_name or schedule.user.email or "Unknown"
 
     def get_vaccine_name(self, obj):
         if obj.vaccine_schedule:
@@ -77,7 +83,7 @@ class PatientVaccineSerializer(serializers.ModelSerializer):
 
 
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=User.objects.filter(account_type="doctor"), required=False)
     doctor = serializers.PrimaryKeyRelatedField(queryset=ClinicDoctor.objects.all(), required=False)
 
@@ -94,6 +100,7 @@ class PatientSerializer(serializers.ModelSerializer):
             "is_active",
             "created_at",
         ]
+        expandable = {"doctor": ClinicDoctorSerializer}
 
     def validate(self, data):
         request = self.context.get("request")
@@ -132,56 +139,86 @@ class PatientSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         patient = Patient.objects.create(user=request.user, **validated_data)
 
-        today = date.today()
-        age_days = (today - patient.date_of_birth).days
-
-        age_to_days = {
-            "Birth": 0, "6 Weeks": 42, "10 Weeks": 70, "14 Weeks": 98,
-            "6 Months": 183, "7 Months": 213, "9 Months": 274,
-            "12 Months": 365, "15 Months": 456, "16–18 Months": 548,
-            "18 Months": 548, "2 Years": 730, "3 Years": 1095,
-            "4 Years": 1460, "4–6 Years": 2190, "5 Years": 1825,
-            "6 Years": 2190, "7 Years": 2555, "8 Years": 2920,
-            "10 Years": 3650, "16–18 Years": 6570,
-        }
-
-        for schedule in VaccineSchedule.objects.all():
-            schedule_days = age_to_days.get(schedule.age, None)
-            if schedule_days is None:
-                continue
-
-            due_date = patient.date_of_birth + timedelta(days=schedule_days)
-
-            if age_days >= schedule_days:
-                PatientVaccine.objects.create(
-                    user=request.user, patient=patient, vaccine_schedule=schedule,
-                    status="Completed", is_completed=True,
-                    completed_on=today, completed_at="Other Private Hospital",
-                    due_date=due_date,
-                )
-            else:
-                status = "Pending" if today > due_date else "Upcoming"
-                PatientVaccine.objects.create(
-                    user=request.user, patient=patient, vaccine_schedule=schedule,
-                    status=status, is_completed=False, due_date=due_date,
-                )
+        # Vaccines already due before registration were given elsewhere.
+        sync_patient_vaccines(patient, completed_at="Other Private Hospital")
 
         return patient
 
+    def update(self, instance, validated_data):
+        dob_changed = (
+            "date_of_birth" in validated_data
+            and validated_data["date_of_birth"] != instance.date_of_birth
+        )
+        patient = super().update(instance, validated_data)
 
-# ---------------- Daily Task to mark inactive ----------------
-def mark_patients_inactive():
-    overdue_vaccines = PatientVaccine.objects.filter(
-        status="Pending",
-        due_date__lt=timezone.now().date() - timedelta(days=7)
-    )
+        if dob_changed:
+            refresh_due_dates(patient_ids=[patient.id])
 
-    for vaccine in overdue_vaccines:
-        vaccine.patient.is_active = False
-        vaccine.patient.save()
+        return patient
+
+
+class PatientImportSerializer(serializers.Serializer):
+    """Validates one row of a bulk patient import without touching the database."""
+    child_name = serializers.CharField(max_length=255)
+    date_of_birth = serializers.DateField(input_formats=["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y"])
+    mobile_number = serializers.RegexField(regex=r'^\d{10}$', error_messages={"invalid": "Mobile number must be 10 digits."})
+    gender = serializers.ChoiceField(choices=Patient.GENDER)
+    doctor = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate_date_of_birth(self, value):
+        if value > date.today():
+            raise serializers.ValidationError("Date of birth cannot be in the future.")
+        return value
+
+    def validate(self, data):
+        user = self.context["user"]
+        clinic_doctors = self.context["clinic_doctors"]
+        doctor_id = data.get("doctor")
+
+        if doctor_id:
+            if doctor_id not in clinic_doctors:
+                raise serializers.ValidationError("Doctor not found in this clinic.")
+            if not clinic_doctors[doctor_id]:
+                raise serializers.ValidationError("This doctor is not active and cannot add patients.")
+        elif user.account_type != "doctor":
+            raise serializers.ValidationError(
+                "Patient must be linked to either an individual doctor or a clinic doctor."
+            )
+
+        data["child_name"] = data["child_name"].strip()
+        return data
+
+
+class BulkVaccineCompletionSerializer(serializers.Serializer):
+    """Input for marking several patient vaccines completed in one request."""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500)
+    completed_at = serializers.ChoiceField(choices=PatientVaccine.COMPLETION_SOURCE)
+    completed_on = serializers.DateField(required=False)
+
+    def validate_completed_on(self, value):
+        if value > date.today():
+            raise serializers.ValidationError("Completion date cannot be in the future.")
+        return value
+
+
+class AppointmentCalendarSerializer(serializers.Serializer):
+    """Date range for the appointment calendar; defaults to the next 30 days."""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    max_days = 366
+
+    def validate(self, data):
+        data.setdefault("start", date.today())
+        data.setdefault("end", data["start"] + timedelta(days=30))
+        if data["end"] < data["start"]:
+            raise serializers.ValidationError("end must not be before start.")
+        if (data["end"] - data["start"]).days > self.max_days:
+            raise serializers.ValidationError(f"The range can span at most {self.max_days} days.")
+        return data
 
 
-class UpcomingPatientVaccineSerializer(serializers.ModelSerializer):
+class UpcomingPatientVaccineSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     patient = PatientSerializer(read_only=True)
     vaccine_name = serializers.CharField(source="vaccine_schedule.vaccine", read_only=True)
     vaccine_age = serializers.CharField(source="vaccine_schedule.age", read_only=True)
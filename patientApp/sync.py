@@ -0,0 +1,149 @@
+import json
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authenticationApp.models import ClinicDoctor
+from authenticationApp.serializers import ClinicDoctorSerializer
+from dashboardApp.models import Tombstone
+from doctorApp.catalog import global_schedule_filter
+from doctorApp.models import VaccineSchedule
+from doctorApp.serializers import VaccineScheduleSerializer
+from patientApp.models import Patient, PatientVaccine
+from patientApp.serializers import PatientSerializer, PatientVaccineSerializer
+
+
+class SyncTokenError(ValueError):
+    """The sync token could not be read."""
+
+
+class SyncTokenExpired(SyncTokenError):
+    """The token predates the tombstones still kept; the client must sync from scratch."""
+
+
+def _entities(user):
+    """Querysets and serializers of everything the app mirrors, per entity name."""
+    return {
+        "patients": (Patient.objects.filter(user=user), PatientSerializer),
+        "patient_vaccines": (
+            PatientVaccine.objects.filter(user=user).select_related("patient", "vaccine_schedule__user"),
+            PatientVaccineSerializer,
+        ),
+        "schedules": (
+            VaccineSchedule.objects.filter(Q(user=user) | Q(patient__user=user) | global_schedule_filter())
+            .select_related("user"),
+            VaccineScheduleSerializer,
+        ),
+        "clinic_doctors": (ClinicDoctor.objects.filter(clinic=user), ClinicDoctorSerializer),
+    }
+
+
+def encode_token(cursors):
+    state = {"issued": timezone.now().isoformat(), "cursors": cursors}
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_token(token):
+    """Per-entity [updated_at, id] cursors from a token; an empty token starts a full sync."""
+    if not token:
+        return {}
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token.encode()))
+        issued = parse_datetime(state["issued"])
+        cursors = {
+            entity: [parse_datetime(at), int(last_id)]
+            for entity, (at, last_id) in state["cursors"].items()
+        }
+        if issued is None or any(at is None for at, _ in cursors.values()):
+            raise ValueError
+    except Exception:
+        raise SyncTokenError("Invalid sync token.")
+
+    retention = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 90))
+    if issued < timezone.now() - retention:
+        raise SyncTokenExpired("Sync token has expired; sync again without 'since'.")
+    return cursors
+
+
+def settled_before():
+    """
+    Instant up to which no commit can still add rows with an earlier stamp.
+
+    A transaction still open may commit rows stamped as far back as its
+    start, so the bound stops at the start of the oldest other transaction
+    that has written anything, however long an import or propagation batch
+    runs. SYNC_SETTLE_SECONDS then covers the gap between a row being
+    stamped in Python and its statement reaching the database, and clock
+    skew between the app and database servers.
+    """
+    with connection.cursor() as cursor:
+        # pg_stat_activity is otherwise read once per transaction.
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            """
+            SELECT min(xact_start) FROM pg_stat_activity
+            WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()
+            """
+        )
+        oldest_open = cursor.fetchone()[0]
+    bound = timezone.now() if oldest_open is None else min(timezone.now(), oldest_open)
+    return bound - timedelta(seconds=getattr(settings, "SYNC_SETTLE_SECONDS", 5))
+
+
+def _read_changes(queryset, stamp, cursor, limit, settled):
+    """
+    Up to `limit` rows after `cursor` in (stamp, id) order, read as one
+    range scan on the (..., stamp, id) index. Returns (rows, next cursor,
+    has_more).
+    """
+    if cursor:
+        at, last_id = cursor
+        queryset = queryset.filter(Q(**{f"{stamp}__gt": at}) | Q(**{stamp: at, "id__gt": last_id}))
+
+    rows = list(queryset.order_by(stamp, "id")[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Rows stamped after `settled` may still be joined by commits carrying
+    # earlier stamps, so the cursor stops short of them, even on a full
+    # page, and they are sent again next time. Everything after the first
+    # such row is unsettled too, so there is no more to page through yet.
+    position = [cursor[0].isoformat(), cursor[1]] if cursor else None
+    for row in rows:
+        if getattr(row, stamp) > settled:
+            has_more = False
+            break
+        position = [getattr(row, stamp).isoformat(), row.id]
+    return rows, position, has_more
+
+
+def changes_since(user, token=None):
+    """
+    Rows of each entity created or changed since the token, ids deleted
+    since then, and the token to send next time. `has_more` means a page
+    limit was hit and the client should call again straight away.
+    """
+    cursors = decode_token(token)
+    limit = getattr(settings, "SYNC_PAGE_SIZE", 500)
+    settled = settled_before()
+
+    result, next_cursors, has_more = {}, {}, False
+    for entity, (queryset, serializer_class) in _entities(user).items():
+        rows, next_cursors[entity], more = _read_changes(queryset, "updated_at", cursors.get(entity), limit, settled)
+        result[entity] = serializer_class(rows, many=True).data
+        has_more = has_more or more
+
+    tombstones = Tombstone.objects.filter(Q(user=user) | Q(user__isnull=True))
+    rows, next_cursors["deleted"], more = _read_changes(tombstones, "deleted_at", cursors.get("deleted"), limit, settled)
+    result["deleted"] = {entity: [] for entity, _ in Tombstone.ENTITIES}
+    for tombstone in rows:
+        result["deleted"][tombstone.entity].append(tombstone.object_id)
+    has_more = has_more or more
+
+    next_cursors = {entity: cursor for entity, cursor in next_cursors.items() if cursor}
+    return {"token": encode_token(next_cursors), "has_more": has_more, **result}
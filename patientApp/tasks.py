@@ -0,0 +1,183 @@
+import time
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from analyticsApp.rollups import VACCINE_FIELDS, apply_deltas, changed, open_vaccine_deltas, patient_bucket, \
+    vaccine_bucket
+from dashboardApp.etags import bump_global_data_version
+from dashboardApp.models import Tombstone
+from doctorApp.utils import send_registered_whatsapp
+from patientApp.models import Patient, PatientVaccine
+from patientApp.utils import welcome_doctor_name
+from timelytots.query_budget import query_budget
+
+
+logger = logging.getLogger(__name__)
+
+
+def _update_in_chunks(queryset, chunk_size, fields=(), on_chunk=None, **changes):
+    """
+    Apply an UPDATE in id chunks so each statement commits quickly and holds
+    few locks. Stamps updated_at, which update() does not, for delta sync.
+    Each chunk is read with row locks in its own transaction and updated
+    through `queryset` again, so a row changed by a request in between
+    (a vaccine completed, a patient reactivated) is left alone. on_chunk(rows)
+    runs in that transaction, with `fields` read for the chunk's rows as
+    they were before the UPDATE.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.select_for_update(of=("self",)).order_by("id").values("id", *fields)[:chunk_size])
+            if not rows:
+                return total
+            # Stamped inside the chunk's transaction, which delta sync relies on.
+            stamped = {"updated_at": timezone.now(), **changes}
+            total += queryset.filter(id__in=[row["id"] for row in rows]).update(**stamped)
+            if on_chunk:
+                on_chunk(rows)
+
+
+def _move_vaccines_to(status):
+    """on_chunk callback moving the chunk's vaccines to `status` in the dashboard rollup."""
+    def apply(rows):
+        deltas = Counter()
+        for row in rows:
+            before = [row[field] for field in VACCINE_FIELDS]
+            deltas.update(changed(vaccine_bucket(*before), vaccine_bucket(*before[:2], status, *before[3:])))
+        apply_deltas(deltas)
+    return apply
+
+
+def _remove_patients_from_rollup(rows):
+    """on_chunk callback for deactivated patients: they and their open vaccines stop counting."""
+    deltas = open_vaccine_deltas(PatientVaccine.objects.filter(patient_id__in=[row["id"] for row in rows]), -1)
+    for row in rows:
+        deltas.update(changed(patient_bucket(row["user_id"], row["created_at"], True), None))
+    apply_deltas(deltas)
+
+
+# --------------------------
+# Celery Tasks
+# --------------------------
+# No query budget: the job runs one SELECT + one UPDATE per VACCINE_STATUS_BATCH_SIZE
+# rows, so its count grows with the backlog and is only known once the updates are done.
+@shared_task
+def update_vaccine_statuses():
+    """
+    Nightly task:
+    Moves PatientVaccine rows between statuses based on due_date so views can
+    read status as-is:
+      - Upcoming -> Pending when the due date has passed
+      - Pending -> Upcoming when the due date was moved into the future
+      - anything marked is_completed -> Completed
+    """
+    today = timezone.now().date()
+    chunk_size = getattr(settings, "VACCINE_STATUS_BATCH_SIZE", 5000)
+
+    overdue = _update_in_chunks(
+        PatientVaccine.objects.filter(status="Upcoming", due_date__lt=today, is_completed=False),
+        chunk_size,
+        fields=VACCINE_FIELDS,
+        on_chunk=_move_vaccines_to("Pending"),
+        status="Pending",
+    )
+    rescheduled = _update_in_chunks(
+        PatientVaccine.objects.filter(status="Pending", due_date__gte=today, is_completed=False),
+        chunk_size,
+        fields=VACCINE_FIELDS,
+        on_chunk=_move_vaccines_to("Upcoming"),
+        status="Upcoming",
+    )
+    completed = _update_in_chunks(
+        PatientVaccine.objects.filter(is_completed=True).exclude(status="Completed"),
+        chunk_size,
+        status="Completed",
+    )
+
+    if overdue or rescheduled or completed:
+        # Rows of many accounts changed without save() signals.
+        bump_global_data_version("patients")
+
+    logger.info(
+        "Vaccine statuses updated: %s overdue, %s rescheduled, %s completed.",
+        overdue, rescheduled, completed,
+    )
+    return f"Vaccine statuses updated: {overdue} overdue, {rescheduled} rescheduled, {completed} completed."
+
+
+# No query budget, for the same reason as update_vaccine_statuses.
+@shared_task
+def mark_patients_inactive():
+    """
+    Daily task:
+    Marks active patients inactive when any of their vaccines has been
+    Pending for more than 7 days. Each patient is updated once, however many
+    vaccines they missed, and no save() signals fire.
+    """
+    cutoff = timezone.now().date() - timedelta(days=7)
+    chunk_size = getattr(settings, "VACCINE_STATUS_BATCH_SIZE", 5000)
+
+    overdue = PatientVaccine.objects.filter(patient=OuterRef("pk"), status="Pending", due_date__lt=cutoff)
+    deactivated = _update_in_chunks(
+        Patient.objects.filter(Exists(overdue), is_active=True),
+        chunk_size,
+        fields=("user_id", "created_at"),
+        on_chunk=_remove_patients_from_rollup,
+        is_active=False,
+    )
+
+    if deactivated:
+        bump_global_data_version("patients")
+
+    logger.info("%s patients marked inactive.", deactivated)
+    return f"{deactivated} patients marked inactive."
+
+
+@shared_task
+@query_budget(lambda patient_ids: 1 + len(patient_ids))  # one ReminderLog row per message
+def send_welcome_messages(patient_ids):
+    """
+    Send the registration WhatsApp message to imported patients, paced at
+    WELCOME_MESSAGES_PER_SECOND so a large import does not flood MSG91.
+    """
+    pause = 1 / getattr(settings, "WELCOME_MESSAGES_PER_SECOND", 5)
+    patients = Patient.objects.filter(id__in=patient_ids).select_related("user", "doctor")
+
+    sent = 0
+    for patient in patients.iterator():
+        try:
+            send_registered_whatsapp(
+                mobile_number=patient.mobile_number,
+                child_name=patient.child_name,
+                doctor_name=welcome_doctor_name(patient),
+                dob=patient.date_of_birth
+            )
+            sent += 1
+        except Exception as e:
+            logger.exception("Welcome message failed for patient %s: %s", patient.id, e)
+        time.sleep(pause)
+
+    return f"{sent} welcome messages sent."
+
+
+@shared_task
+@query_budget(1)
+def purge_sync_tombstones():
+    """
+    Daily task:
+    Deletes tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS. Sync tokens
+    issued before then are refused, so those clients start over instead of
+    missing deletes.
+    """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 90))
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    logger.info("%s sync tombstones purged.", deleted)
+    return f"{deleted} sync tombstones purged."
@@ -1,3 +1,730 @@
-from django.test import TestCase
+import json
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from datetime import date, timedelta
+from authenticationApp.models import User, ClinicDoctor
+from doctorApp.models import VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+from patientApp.tasks import update_vaccine_statuses, mark_patients_inactive
+from patientApp.utils import sync_patient_vaccines, refresh_due_dates, expand_patient_vaccines
+from timelytots.query_budget import query_budget, QueryBudgetExceeded
 
-# Create your tests here.
+
+class PatientVaccineSyncTest(TestCase):
+    """Tests for the versioned sync behind PatientViews.put"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.patient = Patient.objects.create(
+            user=self.doctor,
+            child_name="John Doe",
+            mobile_number="8708559274",
+            date_of_birth=date(2020, 1, 1)
+        )
+        VaccineSchedule.objects.create(user=self.admin, vaccine="Polio Vaccine", due_date=date.today() + timedelta(days=10))
+
+    def test_sync_adds_missing_vaccines_once(self):
+        self.assertEqual(sync_patient_vaccines(self.patient), 1)
+
+        # Catalog unchanged: only the version lookup runs
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_patient_vaccines(self.patient), 0)
+
+        vaccine = PatientVaccine.objects.get(patient=self.patient)
+        self.assertEqual(vaccine.status, "Upcoming")
+
+    def test_catalog_change_triggers_diff(self):
+        sync_patient_vaccines(self.patient)
+        VaccineSchedule.objects.create(user=self.admin, vaccine="MMR", due_date=date.today() - timedelta(days=1))
+
+        self.assertEqual(sync_patient_vaccines(self.patient), 1)
+        self.assertEqual(PatientVaccine.objects.filter(patient=self.patient).count(), 2)
+        self.assertTrue(PatientVaccine.objects.get(vaccine_schedule__vaccine="MMR").is_completed)
+
+
+class SetBasedExpansionTest(TestCase):
+    """Tests for due dates computed in SQL from VaccineSchedule.offset_days"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.birth = VaccineSchedule.objects.create(user=self.admin, vaccine="BCG", age="Birth")
+        self.six_weeks = VaccineSchedule.objects.create(user=self.admin, vaccine="OPV 1", age="6 Weeks")
+        self.patient = Patient.objects.create(
+            user=self.doctor,
+            child_name="Baby Doe",
+            mobile_number="8708559274",
+            date_of_birth=date.today() - timedelta(days=10)
+        )
+
+    def test_offset_days_follow_age(self):
+        self.assertEqual(self.birth.offset_days, 0)
+        self.assertEqual(self.six_weeks.offset_days, 42)
+
+    def test_expansion_computes_due_dates(self):
+        sync_patient_vaccines(self.patient)
+
+        birth = PatientVaccine.objects.get(patient=self.patient, vaccine_schedule=self.birth)
+        six_weeks = PatientVaccine.objects.get(patient=self.patient, vaccine_schedule=self.six_weeks)
+        self.assertEqual(birth.due_date, self.patient.date_of_birth)
+        self.assertTrue(birth.is_completed)
+        self.assertEqual(six_weeks.due_date, self.patient.date_of_birth + timedelta(days=42))
+        self.assertEqual(six_weeks.status, "Upcoming")
+
+    def test_vaccine_due_today_is_upcoming(self):
+        # Due-today vaccines must be picked up by the same day's reminder job.
+        newborn = Patient.objects.create(user=self.doctor, child_name="Baby Roe", mobile_number="8708559275",
+                                         date_of_birth=date.today())
+        sync_patient_vaccines(newborn)
+
+        birth = PatientVaccine.objects.get(patient=newborn, vaccine_schedule=self.birth)
+        self.assertEqual(birth.due_date, date.today())
+        self.assertEqual(birth.status, "Upcoming")
+        self.assertFalse(birth.is_completed)
+
+    def test_refresh_due_dates_after_dob_change(self):
+        sync_patient_vaccines(self.patient)
+        Patient.objects.filter(id=self.patient.id).update(date_of_birth=date.today())
+
+        self.assertEqual(refresh_due_dates(patient_ids=[self.patient.id]), 1)
+        six_weeks = PatientVaccine.objects.get(patient=self.patient, vaccine_schedule=self.six_weeks)
+        self.assertEqual(six_weeks.due_date, date.today() + timedelta(days=42))
+
+
+@override_settings(VACCINE_STATUS_BATCH_SIZE=1)
+class VaccineStatusJobTest(TestCase):
+    """Tests for the nightly update_vaccine_statuses task"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.patient = Patient.objects.create(
+            user=self.doctor,
+            child_name="John Doe",
+            mobile_number="8708559274",
+            date_of_birth=date(2020, 1, 1)
+        )
+        today = date.today()
+        self.overdue = self._vaccine("Upcoming", today - timedelta(days=1))
+        self.due_today = self._vaccine("Upcoming", today)
+        self.moved = self._vaccine("Pending", today + timedelta(days=5))
+        self.done = self._vaccine("Pending", today - timedelta(days=5), is_completed=True)
+
+    def _vaccine(self, status, due_date, is_completed=False):
+        return PatientVaccine.objects.create(
+            user=self.doctor, patient=self.patient, custom_vaccine=f"{status} {due_date}",
+            status=status, due_date=due_date, is_completed=is_completed,
+        )
+
+    def test_statuses_follow_due_date(self):
+        result = update_vaccine_statuses()
+
+        self.assertEqual(result, "Vaccine statuses updated: 1 overdue, 1 rescheduled, 1 completed.")
+        statuses = dict(PatientVaccine.objects.values_list("id", "status"))
+        self.assertEqual(statuses[self.overdue.id], "Pending")
+        self.assertEqual(statuses[self.due_today.id], "Upcoming")
+        self.assertEqual(statuses[self.moved.id], "Upcoming")
+        self.assertEqual(statuses[self.done.id], "Completed")
+
+    def test_mark_patients_inactive_updates_each_patient_once(self):
+        self._vaccine("Pending", date.today() - timedelta(days=10))
+        self._vaccine("Pending", date.today() - timedelta(days=20))
+
+        self.assertEqual(mark_patients_inactive(), "1 patients marked inactive.")
+        self.patient.refresh_from_db()
+        self.assertFalse(self.patient.is_active)
+        self.assertEqual(mark_patients_inactive(), "0 patients marked inactive.")
+
+
+class PatientImportTest(TestCase):
+    """Tests for the bulk patient import endpoint"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        VaccineSchedule.objects.create(user=self.admin, vaccine="BCG", age="Birth")
+        VaccineSchedule.objects.create(user=self.admin, vaccine="OPV 1", age="6 Weeks")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_json_import_reports_row_errors_and_duplicates(self):
+        rows = [
+            {"child_name": "Asha", "date_of_birth": "2024-01-10", "mobile_number": "9876543210", "gender": "Female"},
+            {"child_name": "Ravi", "date_of_birth": "2024-02-10", "mobile_number": "12345", "gender": "Male"},
+            {"child_name": " asha ", "date_of_birth": "2024-01-10", "mobile_number": "9876543210", "gender": "Female"},
+        ]
+        response = self.client.post("/api/patient/import/?send_welcome=false", rows, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(response.data["duplicates"], 1)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+
+        patient = Patient.objects.get(user=self.doctor)
+        self.assertEqual(PatientVaccine.objects.filter(patient=patient).count(), 2)
+
+    def test_csv_import_skips_existing_patients(self):
+        Patient.objects.create(
+            user=self.doctor, child_name="Asha", mobile_number="9876543210",
+            date_of_birth=date(2024, 1, 10), gender="Female",
+        )
+        upload = SimpleUploadedFile("patients.csv", (
+            "child_name,date_of_birth,mobile_number,gender,doctor\n"
+            "Asha,10-01-2024,9876543210,Female,\n"
+            "Meera,2024-03-01,9876543211,Female,\n"
+        ).encode())
+        response = self.client.post("/api/patient/import/?send_welcome=false", {"file": upload})
+
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual(response.data["duplicates"], 1)
+        self.assertTrue(Patient.objects.filter(child_name="Meera").exists())
+
+
+class BulkVaccineCompletionTest(TestCase):
+    """Tests for the bulk vaccine completion endpoint"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.other = User.objects.create(full_name="Dr. Other", email="other@test.com", account_type="doctor")
+        patient = Patient.objects.create(
+            user=self.doctor, child_name="John Doe", mobile_number="8708559274", date_of_birth=date(2024, 1, 1)
+        )
+        other_patient = Patient.objects.create(
+            user=self.other, child_name="Jane Doe", mobile_number="8708559275", date_of_birth=date(2024, 1, 1)
+        )
+        self.open = PatientVaccine.objects.create(
+            user=self.doctor, patient=patient, vaccine_schedule=VaccineSchedule.objects.create(vaccine="BCG")
+        )
+        self.done = PatientVaccine.objects.create(
+            user=self.doctor, patient=patient, vaccine_schedule=VaccineSchedule.objects.create(vaccine="OPV 1"),
+            is_completed=True, status="Completed",
+        )
+        self.foreign = PatientVaccine.objects.create(
+            user=self.other, patient=other_patient, vaccine_schedule=VaccineSchedule.objects.create(vaccine="OPV 2")
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_bulk_completion_reports_each_id(self):
+        payload = {
+            "ids": [self.open.id, self.done.id, self.foreign.id, 999999],
+            "completed_at": "Admin Doctor",
+            "completed_on": "2025-01-15",
+        }
+        # Ownership lock, the UPDATE and the ETag version bump in a savepoint, then the rollup upsert.
+        with self.assertNumQueries(6):
+            response = self.client.patch("/api/patient/vaccine/complete/bulk/", payload, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["completed"], 1)
+        self.assertEqual(response.data["results"], {
+            self.open.id: "completed",
+            self.done.id: "already_completed",
+            self.foreign.id: "not_found",
+            999999: "not_found",
+        })
+
+        self.open.refresh_from_db()
+        self.assertEqual(self.open.status, "Completed")
+        self.assertEqual(self.open.completed_on, date(2025, 1, 15))
+        self.foreign.refresh_from_db()
+        self.assertFalse(self.foreign.is_completed)
+
+    def test_invalid_completion_source_is_rejected(self):
+        response = self.client.patch(
+            "/api/patient/vaccine/complete/bulk/", {"ids": [self.open.id], "completed_at": "Home"}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PatientSearchTest(TestCase):
+    """Tests for the ranked, paginated patient search"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        other = User.objects.create(full_name="Dr. Other", email="other@test.com", account_type="doctor")
+        for name, mobile in [("Riya Shah", "9000000001"), ("Riya", "9000000002"), ("Aarav Riyaz", "9111111111"),
+                             ("Riyansh Mehta", "9000000003"), ("Kabir", "8000000000")]:
+            Patient.objects.create(user=self.doctor, child_name=name, mobile_number=mobile, date_of_birth=date(2023, 1, 1))
+        Patient.objects.create(user=other, child_name="Riya", mobile_number="9000000009", date_of_birth=date(2023, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def names(self, response):
+        return [row["child_name"] for row in response.data]
+
+    def test_results_are_ranked_and_paginated(self):
+        response = self.client.get("/api/patient/search/", {"search": "  RIYA ", "limit": 2})
+        self.assertEqual(self.names(response), ["Riya", "Riya Shah"])
+        self.assertEqual(response["X-Next-Offset"], "2")
+
+        response = self.client.get("/api/patient/search/", {"search": "riya", "limit": 2, "offset": 2})
+        self.assertEqual(self.names(response), ["Riyansh Mehta", "Aarav Riyaz"])
+        self.assertFalse(response.has_header("X-Next-Offset"))
+        # The full patient representation, as before pagination.
+        self.assertEqual(response.data[0]["user"], self.doctor.id)
+        self.assertIn("created_at", response.data[0])
+
+    def test_digits_match_mobile_prefix(self):
+        response = self.client.get("/api/patient/search/", {"search": "90000"})
+        self.assertEqual(self.names(response), ["Riya Shah", "Riya", "Riyansh Mehta"])
+
+        response = self.client.get("/api/patient/search/", {"search": "zzz"})
+        self.assertEqual(response.status_code, 204)
+
+
+class KeysetPaginationTest(TestCase):
+    """Tests for opt-in cursor pagination on patient and vaccine lists"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.patients = [
+            Patient.objects.create(user=self.doctor, child_name=f"Child {i}", mobile_number=f"900000000{i}",
+                                   date_of_birth=date(2023, 1, 1))
+            for i in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def walk(self, url, params):
+        seen, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            pages += 1
+            seen += response.data["results"]
+            if not response.data["next"]:
+                return seen, pages
+            response = self.client.get(response.data["next"])
+
+    def test_patients_walk_newest_first(self):
+        rows, pages = self.walk("/api/patient/", {"cursor": "", "limit": 2, "count": "exact"})
+        self.assertEqual(pages, 3)
+        self.assertEqual([row["patient"]["id"] for row in rows], [p.id for p in reversed(self.patients)])
+
+    def test_vaccines_walk_by_due_date_with_nulls_last(self):
+        today = date.today()
+        for i, due in enumerate([today, None, today, today - timedelta(days=3)]):
+            PatientVaccine.objects.create(
+                user=self.doctor, patient=self.patients[0], due_date=due,
+                vaccine_schedule=VaccineSchedule.objects.create(user=self.doctor, vaccine=f"Vaccine {i}"),
+            )
+        expected = list(PatientVaccine.objects.order_by("due_date", "id").values_list("id", flat=True))
+
+        rows, pages = self.walk("/api/patient/vaccine/", {"cursor": "", "limit": 1})
+        self.assertEqual(pages, 4)
+        self.assertEqual([row["id"] for row in rows], expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/patient/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class PatientListSummaryTest(TestCase):
+    """Tests for the inline vaccine summary on the patient list"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        today = date.today()
+        for i in range(3):
+            patient = Patient.objects.create(user=self.doctor, child_name=f"Child {i}", mobile_number=f"900000000{i}",
+                                             date_of_birth=date(2023, 1, 1))
+            for name, due, state in [("BCG", today - timedelta(days=30), "Completed"),
+                                     ("OPV 1", today - timedelta(days=2), "Pending"),
+                                     ("MMR", today + timedelta(days=40), "Upcoming"),
+                                     ("DTP", today + timedelta(days=10), "Upcoming")]:
+                PatientVaccine.objects.create(
+                    user=self.doctor, patient=patient, due_date=due, status=state, is_completed=state == "Completed",
+                    vaccine_schedule=VaccineSchedule.objects.create(user=self.doctor, vaccine=name),
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_summary_is_computed_in_the_page_query(self):
+        # The ETag version lookup, then the page itself.
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/patient/", {"cursor": "", "summary": "1"})
+
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(response.data["results"][0]["vaccine_summary"], {
+            "completed": 1,
+            "upcoming": 2,
+            "pending": 1,
+            "next_due_date": (date.today() + timedelta(days=10)).strftime("%d-%b-%Y"),
+            "next_due_vaccine": "DTP",
+        })
+
+    def test_summary_is_opt_in(self):
+        response = self.client.get("/api/patient/")
+        self.assertNotIn("vaccine_summary", response.data["results"][0])
+
+
+class PatientDetailQueryTest(TestCase):
+    """Tests for the grouped patient detail payload"""
+
+    def setUp(self):
+        self.admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def make_patient(self, mobile, vaccines):
+        patient = Patient.objects.create(user=self.doctor, child_name="Child", mobile_number=mobile,
+                                         date_of_birth=date.today() - timedelta(days=100))
+        sync_patient_vaccines(patient)
+        for i in range(vaccines):
+            PatientVaccine.objects.create(
+                user=self.doctor, patient=patient, due_date=date.today() + timedelta(days=i),
+                vaccine_schedule=VaccineSchedule.objects.create(user=self.doctor, patient=patient, vaccine=f"Custom {i}"),
+            )
+        patient.refresh_from_db()
+        sync_patient_vaccines(patient)
+        return patient
+
+    def test_query_count_does_not_grow_with_vaccines(self):
+        VaccineSchedule.objects.create(user=self.admin, vaccine="BCG", age="Birth")
+        small = self.make_patient("9000000001", 1)
+        large = self.make_patient("9000000002", 8)
+
+        with self.assertNumQueries(3):
+            self.client.put(f"/api/patient/{small.id}/")
+        with self.assertNumQueries(3):
+            response = self.client.put(f"/api/patient/{large.id}/")
+
+        vaccines = response.data["vaccines"]
+        self.assertEqual(len(vaccines["Upcoming"]), 8)
+        self.assertEqual(vaccines["Completed"][0]["added_by"], "Admin")
+        self.assertEqual(vaccines["Upcoming"][0]["added_by"], "Dr. Test Doctor")
+
+
+class PatientVaccineListTest(TestCase):
+    """Tests for filtering and streaming GET /patient/vaccine/"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.patient = Patient.objects.create(user=self.doctor, child_name="Child", mobile_number="9000000001",
+                                              date_of_birth=date(2024, 1, 1))
+        other = Patient.objects.create(user=self.doctor, child_name="Other", mobile_number="9000000002",
+                                       date_of_birth=date(2024, 1, 1))
+        for patient in (self.patient, other):
+            for name, due, state in [("BCG", date(2024, 1, 1), "Completed"),
+                                     ("OPV 1", date(2024, 2, 12), "Pending"),
+                                     ("MMR", date(2030, 1, 1), "Upcoming")]:
+                PatientVaccine.objects.create(
+                    user=self.doctor, patient=patient, due_date=due, status=state,
+                    vaccine_schedule=VaccineSchedule.objects.create(user=self.doctor, vaccine=name),
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_filters_combine_with_cursor_pagination(self):
+        response = self.client.get("/api/patient/vaccine/", {
+            "cursor": "", "patient": self.patient.id, "due_from": "2024-01-15", "vaccine": "opv 1",
+        })
+        self.assertEqual([row["vaccine_name"] for row in response.data["results"]], ["OPV 1"])
+
+        response = self.client.get("/api/patient/vaccine/", {"cursor": "", "status": "Upcoming", "limit": 1})
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.client.get("/api/patient/vaccine/", {"status": "Missed"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_is_paginated_when_a_limit_is_given(self):
+        response = self.client.get("/api/patient/vaccine/")
+        self.assertEqual(len(response.data), 6)
+
+        response = self.client.get("/api/patient/vaccine/", {"limit": 1000})
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get("/api/patient/vaccine/", {"limit": 4})
+        self.assertEqual(len(response.data["results"]), 4)
+        self.assertEqual(len(self.client.get(response.data["next"]).data["results"]), 2)
+
+    def test_stream_emits_one_row_per_line(self):
+        response = self.client.get("/api/patient/vaccine/", {"stream": "1", "due_to": "2024-12-31"})
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row["due_date"] for row in rows], ["2024-01-01", "2024-01-01", "2024-02-12", "2024-02-12"])
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class QueryBudgetTest(TestCase):
+    """Endpoints and tasks stay within their query budgets on a seeded practice"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        cls.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        for age in ["Birth", "6 Weeks", "10 Weeks", "14 Weeks", "6 Months", "9 Months", "12 Months", "15 Months"]:
+            VaccineSchedule.objects.create(user=admin, vaccine=f"Vaccine at {age}", age=age)
+        VaccineSchedule.objects.create(user=cls.doctor, vaccine="Doctor's own", age="18 Months")
+
+        patients = Patient.objects.bulk_create([
+            Patient(user=cls.doctor, child_name=f"Child {i}", mobile_number=f"90000{i:05d}",
+                    date_of_birth=date.today() - timedelta(days=7 * i))
+            for i in range(60)
+        ])
+        expand_patient_vaccines([patient.id for patient in patients])
+        cls.patient = patients[-1]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.doctor).access_token}")
+
+    def test_patient_endpoints_stay_within_budget(self):
+        for url, params in [
+            ("/api/patient/", {}),
+            ("/api/patient/", {"cursor": "", "summary": "1"}),
+            ("/api/patient/search/", {"search": "child 1"}),
+            ("/api/patient/vaccine/", {"cursor": "", "count": "exact", "limit": 100}),
+            ("/api/patient/vaccine/", {"status": "Upcoming"}),
+            ("/api/upcoming/appointments/", {}),
+            ("/api/sync/", {}),
+        ]:
+            response = self.client.get(url, params)
+            self.assertIn(response.status_code, (200, 204), url)
+
+        response = self.client.put(f"/api/patient/{self.patient.id}/")
+        self.assertEqual(response.status_code, 200)
+
+        ids = list(PatientVaccine.objects.filter(patient=self.patient).values_list("id", flat=True))
+        response = self.client.patch("/api/patient/vaccine/complete/bulk/", {"ids": ids, "completed_at": "Admin Doctor"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_violation_raises(self):
+        @query_budget(2)
+        def patient_names():
+            return [vaccine.patient.child_name for vaccine in PatientVaccine.objects.all()[:5]]
+
+        with self.assertRaises(QueryBudgetExceeded):
+            patient_names()
+
+    def test_tasks_stay_within_budget(self):
+        update_vaccine_statuses()
+        mark_patients_inactive()
+
+
+class VaccineSearchTest(TestCase):
+    """Tests for the in-process catalog index behind VaccineSearch"""
+
+    def setUp(self):
+        admin = User.objects.create(full_name="Admin", email="admin@test.com", account_type="doctor", is_staff=True)
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        patient = Patient.objects.create(user=self.doctor, child_name="Child", mobile_number="9000000001",
+                                         date_of_birth=date(2024, 1, 1))
+        for vaccine, age in [("OPV 1", "6 Weeks"), ("Pentavalent 1", "6 Weeks"), ("OPV 2", "10 Weeks"),
+                             ("OPV 1", "6 Weeks"), ("MMR 1", "9 Months")]:
+            VaccineSchedule.objects.create(user=admin, vaccine=vaccine, age=age)
+        VaccineSchedule.objects.create(user=self.doctor, patient=patient, vaccine="OPV Custom")
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_typeahead_uses_index(self):
+        response = self.client.get("/api/vaccine/search/", {"search": "op"})
+        self.assertEqual(response.data, [{"vaccine": "OPV 1", "age": "6 Weeks"}, {"vaccine": "OPV 2", "age": "10 Weeks"}])
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/vaccine/search/", {"search": "6 wee"})
+        self.assertEqual([row["vaccine"] for row in response.data], ["OPV 1", "Pentavalent 1"])
+
+    def test_catalog_write_rebuilds_index(self):
+        self.client.get("/api/vaccine/search/", {"search": "bcg"})
+        VaccineSchedule.objects.create(user=None, vaccine="BCG", age="Birth")
+
+        response = self.client.get("/api/vaccine/search/", {"search": "bcg"})
+        self.assertEqual(response.data, [{"vaccine": "BCG", "age": "Birth"}])
+
+
+class AppointmentCalendarTest(TestCase):
+    """Tests for the calendar counts and per-day detail endpoints"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.day = date.today() + timedelta(days=5)
+        asha = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        ravi = Patient.objects.create(user=self.doctor, child_name="Ravi", mobile_number="9000000002", date_of_birth=date(2024, 1, 1))
+        for patient, name, due, completed in [(asha, "OPV 1", self.day, False), (asha, "Penta 1", self.day, False),
+                                              (ravi, "OPV 1", self.day, False), (ravi, "BCG", self.day, True),
+                                              (ravi, "MMR", self.day + timedelta(days=2), False)]:
+            PatientVaccine.objects.create(
+                user=self.doctor, patient=patient, due_date=due, is_completed=completed,
+                vaccine_schedule=VaccineSchedule.objects.create(user=self.doctor, vaccine=name, age="6 Weeks"),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_calendar_counts_per_day(self):
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/upcoming/appointments/calendar/")
+
+        self.assertEqual(response.data["days"], [
+            {"date": self.day, "vaccines": 3, "patients": 2},
+            {"date": self.day + timedelta(days=2), "vaccines": 1, "patients": 1},
+        ])
+
+        response = self.client.get("/api/upcoming/appointments/calendar/", {"start": "2025-01-01", "end": "2027-01-02"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_day_detail_deduplicates_patients(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/upcoming/appointments/calendar/{self.day.isoformat()}/")
+
+        self.assertEqual([row["vaccine_name"] for row in response.data["appointments"]], ["OPV 1", "Penta 1", "OPV 1"])
+        self.assertEqual(sorted(patient["child_name"] for patient in response.data["patients"].values()), ["Asha", "Ravi"])
+
+
+class SparseFieldsetTest(TestCase):
+    """Tests for ?fields= and ?expand= on the patient and upcoming appointment lists"""
+
+    def setUp(self):
+        self.clinic = User.objects.create(full_name="City Clinic", email="clinic@test.com", account_type="clinic")
+        self.doctor = ClinicDoctor.objects.create(clinic=self.clinic, name="Dr. Rao", speciality="Pediatrics", is_active=True)
+        self.patient = Patient.objects.create(
+            user=self.clinic, doctor=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1)
+        )
+        PatientVaccine.objects.create(
+            user=self.clinic, patient=self.patient, due_date=date.today() + timedelta(days=3),
+            vaccine_schedule=VaccineSchedule.objects.create(user=self.clinic, vaccine="OPV 1", age="6 Weeks"),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.clinic)
+
+    def test_patient_list_selects_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/patient/", {"cursor": "", "fields": "id,child_name"})
+
+        self.assertEqual(response.data["results"], [{"patient": {"id": self.patient.id, "child_name": "Asha"}}])
+        page_query = queries.captured_queries[-1]["sql"]
+        self.assertIn('"child_name"', page_query)
+        self.assertNotIn('"mobile_number"', page_query)
+
+    def test_expand_nests_the_related_object(self):
+        response = self.client.get("/api/patient/", {"cursor": "", "fields": "id,doctor", "expand": "doctor"})
+        self.assertEqual(response.data["results"][0]["patient"]["doctor"]["name"], "Dr. Rao")
+
+        response = self.client.get("/api/patient/", {"fields": "id,nickname"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_upcoming_nested_fields(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/upcoming/appointments/", {"fields": "vaccine_name,patient.child_name"})
+
+        self.assertEqual(response.data, [{"vaccine_name": "OPV 1", "patient": {"child_name": "Asha"}}])
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class DeltaSyncTest(TestCase):
+    """Tests for the /api/sync/ delta sync endpoint"""
+
+    def setUp(self):
+        self.doctor = User.objects.create(full_name="Dr. Test Doctor", email="doctor@test.com", account_type="doctor")
+        self.other = User.objects.create(full_name="Dr. Other Doctor", email="other@test.com", account_type="doctor")
+        self.patient = Patient.objects.create(user=self.doctor, child_name="Asha", mobile_number="9000000001", date_of_birth=date(2024, 1, 1))
+        Patient.objects.create(user=self.other, child_name="Ravi", mobile_number="9000000002", date_of_birth=date(2024, 1, 1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def sync(self, token=None):
+        response = self.client.get("/api/sync/", {"since": token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_second_sync_returns_only_changes(self):
+        first = self.sync()
+        self.assertEqual([row["child_name"] for row in first["patients"]], ["Asha"])
+
+        with self.assertNumQueries(7):
+            unchanged = self.sync(first["token"])
+        self.assertEqual(unchanged["patients"], [])
+
+        self.patient.child_name = "Asha K"
+        self.patient.save()
+        added = Patient.objects.create(user=self.doctor, child_name="Meera", mobile_number="9000000003", date_of_birth=date(2024, 2, 1))
+        changed = self.sync(unchanged["token"])
+        self.assertEqual([row["child_name"] for row in changed["patients"]], ["Asha K", "Meera"])
+
+        added_id = added.id
+        added.delete()
+        deleted = self.sync(changed["token"])
+        self.assertEqual(deleted["patients"], [])
+        self.assertEqual(deleted["deleted"]["patients"], [added_id])
+
+    def test_bulk_updates_are_picked_up(self):
+        vaccine = PatientVaccine.objects.create(
+            user=self.doctor, patient=self.patient, due_date=date.today() - timedelta(days=1), status="Upcoming"
+        )
+        token = self.sync()["token"]
+
+        update_vaccine_statuses()
+        changes = self.sync(token)
+        self.assertEqual([(row["id"], row["status"]) for row in changes["patient_vaccines"]], [(vaccine.id, "Pending")])
+
+    @override_settings(SYNC_SETTLE_SECONDS=0)
+    def test_open_write_transaction_holds_the_cursor_back(self):
+        token = self.sync()["token"]
+        other = connection.get_new_connection(connection.get_connection_params())
+        try:
+            # A long batch elsewhere: its rows may commit later with stamps from now on.
+            other.autocommit = False
+            other.cursor().execute("SELECT pg_current_xact_id()")
+            Patient.objects.create(user=self.doctor, child_name="Meera", mobile_number="9000000003", date_of_birth=date(2024, 2, 1))
+            held = self.sync(token)
+            self.assertEqual([row["child_name"] for row in held["patients"]], ["Meera"])
+            self.assertEqual([row["child_name"] for row in self.sync(held["token"])["patients"]], ["Meera"])
+        finally:
+            other.close()
+
+        released = self.sync(held["token"])
+        self.assertEqual([row["child_name"] for row in released["patients"]], ["Meera"])
+        self.assertEqual(self.sync(released["token"])["patients"], [])
+
+    @override_settings(SYNC_SETTLE_SECONDS=0, SYNC_PAGE_SIZE=1)
+    def test_full_pages_stop_at_open_write_transactions(self):
+        token = self.sync()["token"]
+        other = connection.get_new_connection(connection.get_connection_params())
+        try:
+            other.autocommit = False
+            cursor = other.cursor()
+            cursor.execute("SELECT pg_current_xact_id(), now()")
+            started = cursor.fetchone()[1]
+            for name, mobile in [("Meera", "9000000003"), ("Nisha", "9000000004")]:
+                Patient.objects.create(user=self.doctor, child_name=name, mobile_number=mobile, date_of_birth=date(2024, 2, 1))
+            page = self.sync(token)
+            self.assertEqual(([row["child_name"] for row in page["patients"]], page["has_more"]), (["Meera"], False))
+
+            # The open batch commits a row stamped before the page just read.
+            late = Patient.objects.create(user=self.doctor, child_name="Priya", mobile_number="9000000005", date_of_birth=date(2024, 2, 1))
+            Patient.objects.filter(id=late.id).update(updated_at=started)
+        finally:
+            other.close()
+
+        names, token, has_more = [], page["token"], True
+        while has_more:
+            page = self.sync(token)
+            names += [row["child_name"] for row in page["patients"]]
+            token, has_more = page["token"], page["has_more"]
+        self.assertEqual(names, ["Priya", "Meera", "Nisha"])
+
+    def test_cascaded_children_are_not_tombstoned(self):
+        PatientVaccine.objects.create(user=self.doctor, patient=self.patient, due_date=date.today())
+        token = self.sync()["token"]
+
+        patient_id = self.patient.id
+        self.patient.delete()
+        deleted = self.sync(token)["deleted"]
+        self.assertEqual(deleted["patients"], [patient_id])
+        self.assertEqual(deleted["patient_vaccines"], [])
+
+    def test_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get("/api/sync/", {"since": "nonsense"}).status_code, 400)
+        with override_settings(SYNC_TOMBSTONE_RETENTION_DAYS=-1):
+            response = self.client.get("/api/sync/", {"since": self.sync()["token"]})
+        self.assertEqual(response.status_code, 410)
@@ -1,12 +1,14 @@
 from django.urls import path
 from patientApp.views import PatientViews, PatientMarkActive, PatientMarkInactive, PatientSearch, \
-    PatientVaccineViews, MarkVaccineCompletedView, MarkVaccinePendingView, VaccineSearch, UpcomingAppointmentsView
+    PatientVaccineViews, MarkVaccineCompletedView, MarkVaccinePendingView, VaccineSearch, UpcomingAppointmentsView, \
+    PatientImportView, BulkMarkVaccineCompletedView, AppointmentCalendarView, AppointmentDayView, SyncView
 
 urlpatterns = [
     path("patient/", PatientViews.as_view(), name="patient"),
     path("patient/<int:id>/", PatientViews.as_view(), name="patient"),
 
     path("patient/search/", PatientSearch.as_view(), name="patient_search"),
+    path("patient/import/", PatientImportView.as_view(), name="patient_import"),
 
     path("patient/mark/active/<int:id>/", PatientMarkActive.as_view(), name="mark_active"),
     path("patient/mark/inactive/<int:id>/", PatientMarkInactive.as_view(), name="mark_inactive"),
@@ -16,10 +18,15 @@ urlpatterns = [
 
     path("patient/vaccine/complete/<int:pk>/", MarkVaccineCompletedView.as_view(), name="mark-vaccine-complete"),
     path("patient/vaccine/pending/<int:pk>/", MarkVaccinePendingView.as_view(), name="mark-vaccine-pending"),
+    path("patient/vaccine/complete/bulk/", BulkMarkVaccineCompletedView.as_view(), name="mark-vaccines-complete-bulk"),
 
     path('vaccine/search/', VaccineSearch.as_view(), name='search'),
 
     path('upcoming/appointments/', UpcomingAppointmentsView.as_view(), name='upcoming_appointments'),
+    path('upcoming/appointments/calendar/', AppointmentCalendarView.as_view(), name='appointment_calendar'),
+    path('upcoming/appointments/calendar/<str:day>/', AppointmentDayView.as_view(), name='appointment_day'),
+
+    path('sync/', SyncView.as_view(), name='sync'),
 
 ]
 
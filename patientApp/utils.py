@@ -0,0 +1,215 @@
+from collections import Counter
+from datetime import date
+
+from django.db import connection
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from analyticsApp.rollups import apply_deltas, changed, due_bucket, vaccine_bucket
+from authenticationApp.models import User
+from dashboardApp.etags import bump_data_version
+from doctorApp.catalog import get_catalog_version
+from doctorApp.models import VaccineSchedule
+from patientApp.models import Patient, PatientVaccine
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+# Catalog entries that apply to patient "p": its own custom schedules plus
+# shared entries (admin, unowned, or added by the patient's doctor).
+CATALOG_JOIN = f"""
+    JOIN {_table(VaccineSchedule)} s ON (
+        s.patient_id = p.id
+        OR (
+            s.patient_id IS NULL
+            AND (
+                s.user_id IS NULL
+                OR s.user_id = p.user_id
+                OR s.user_id IN (SELECT id FROM {_table(User)} WHERE is_staff)
+            )
+        )
+    )
+"""
+
+# Fixed-date schedules win over age-based ones.
+DUE_DATE_SQL = "COALESCE(s.due_date, p.date_of_birth + s.offset_days)"
+
+
+def expand_patient_vaccines(patient_ids, completed_at="Auto-generated", schedule_ids=None):
+    """
+    Insert every catalog vaccine the given patients are missing with one
+    INSERT ... SELECT, computing due dates in the database.
+
+    Vaccines already past due are recorded as completed with the given
+    completion source. Returns the number of rows inserted.
+    """
+    today = date.today()
+    params = {
+        "today": today,
+        "now": timezone.now(),
+        "completed_at": completed_at,
+        "patient_ids": list(patient_ids),
+        "schedule_ids": list(schedule_ids) if schedule_ids is not None else None,
+    }
+    sql = f"""
+        WITH inserted AS (
+            INSERT INTO {_table(PatientVaccine)} (
+                user_id, patient_id, vaccine_schedule_id, due_date, status,
+                is_completed, completed_on, completed_at, created_at, updated_at, notification_sent
+            )
+            SELECT
+                p.user_id, p.id, s.id, d.due_date,
+                CASE
+                    WHEN d.due_date < %(today)s THEN 'Completed'
+                    ELSE 'Upcoming'
+                END,
+                d.due_date < %(today)s,
+                CASE WHEN d.due_date < %(today)s THEN %(today)s END,
+                CASE WHEN d.due_date < %(today)s THEN %(completed_at)s END,
+                %(now)s, %(now)s, false
+            FROM {_table(Patient)} p
+            {CATALOG_JOIN}
+            CROSS JOIN LATERAL (SELECT {DUE_DATE_SQL} AS due_date) d
+            WHERE p.id = ANY(%(patient_ids)s)
+              AND d.due_date IS NOT NULL
+              AND (%(schedule_ids)s::bigint[] IS NULL OR s.id = ANY(%(schedule_ids)s::bigint[]))
+            ON CONFLICT (patient_id, vaccine_schedule_id) DO NOTHING
+            RETURNING user_id, patient_id, due_date, status, is_completed, completed_on, completed_at
+        )
+        SELECT i.user_id, i.due_date, i.status, i.is_completed, i.completed_on, i.completed_at, p.is_active
+        FROM inserted i JOIN {_table(Patient)} p ON p.id = i.patient_id
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    # Bypasses save() signals, so move the ETag counters and dashboard rollups here.
+    bump_data_version("patients", [row[0] for row in rows])
+    deltas = Counter()
+    for row in rows:
+        deltas.update([vaccine_bucket(*row), due_bucket(row[0], row[1])])
+    apply_deltas(deltas)
+    return len(rows)
+
+
+def refresh_due_dates(patient_ids=None, schedule_ids=None):
+    """
+    Recompute due dates with a single UPDATE for vaccines that are not
+    completed yet, after a date of birth or a schedule's age or date has
+    changed. Returns the number of rows updated.
+    """
+    today = date.today()
+    params = {
+        "today": today,
+        "now": timezone.now(),
+        "patient_ids": list(patient_ids) if patient_ids is not None else None,
+        "schedule_ids": list(schedule_ids) if schedule_ids is not None else None,
+    }
+    # "old" is the same row as read before the UPDATE, for the rollup deltas.
+    sql = f"""
+        UPDATE {_table(PatientVaccine)} pv
+        SET due_date = {DUE_DATE_SQL},
+            status = CASE WHEN {DUE_DATE_SQL} < %(today)s THEN 'Pending' ELSE 'Upcoming' END,
+            updated_at = %(now)s
+        FROM {_table(Patient)} p, {_table(VaccineSchedule)} s, {_table(PatientVaccine)} old
+        WHERE pv.patient_id = p.id
+          AND pv.vaccine_schedule_id = s.id
+          AND old.id = pv.id
+          AND pv.is_completed = false
+          AND {DUE_DATE_SQL} IS NOT NULL
+          AND pv.due_date IS DISTINCT FROM {DUE_DATE_SQL}
+          AND (%(patient_ids)s::bigint[] IS NULL OR p.id = ANY(%(patient_ids)s::bigint[]))
+          AND (%(schedule_ids)s::bigint[] IS NULL OR s.id = ANY(%(schedule_ids)s::bigint[]))
+        RETURNING pv.user_id, p.is_active, old.due_date, old.status, pv.due_date, pv.status
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    bump_data_version("patients", [row[0] for row in rows])
+
+    deltas = Counter()
+    for user_id, active, old_due, old_status, new_due, new_status in rows:
+        deltas.update(changed(
+            vaccine_bucket(user_id, old_due, old_status, False, None, None, active),
+            vaccine_bucket(user_id, new_due, new_status, False, None, None, active),
+        ))
+        deltas.update(changed(due_bucket(user_id, old_due), due_bucket(user_id, new_due)))
+    apply_deltas(deltas)
+    return len(rows)
+
+
+def sync_patient_vaccines(patient, completed_at="Auto-generated"):
+    """
+    Bring the patient's vaccines in line with the schedule catalog.
+
+    Nothing is read or written beyond the version check when the patient was
+    already synced against the current catalog version. Otherwise only the
+    schedules the patient is missing are inserted, in a single statement.
+    Returns the number of vaccines added.
+    """
+    version = get_catalog_version()
+    if patient.schedule_version == version:
+        return 0
+
+    added = expand_patient_vaccines([patient.id], completed_at=completed_at)
+
+    Patient.objects.filter(id=patient.id).update(schedule_version=version)
+    patient.schedule_version = version
+    return added
+
+
+def welcome_doctor_name(patient):
+    """Doctor name shown in the registration WhatsApp message."""
+    user = patient.user
+    if user.account_type == "doctor":
+        return user.full_name
+    if user.account_type == "clinic" and patient.doctor:
+        return patient.doctor.name
+    return "Doctor"
+
+
+def _vaccine_count(**filters):
+    counts = (
+        PatientVaccine.objects.filter(patient=OuterRef("pk"), **filters)
+        .order_by().values("patient").annotate(n=Count("id")).values("n")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_vaccine_summary(patients):
+    """
+    Annotate a Patient queryset with per-status vaccine counts and the next
+    upcoming vaccine, as correlated subqueries of the same SELECT so they
+    are only evaluated for the rows of the page being read.
+    """
+    next_due = PatientVaccine.objects.filter(
+        patient=OuterRef("pk"), status="Upcoming", due_date__isnull=False
+    ).order_by("due_date", "id")
+
+    return patients.annotate(
+        completed_count=_vaccine_count(status="Completed"),
+        upcoming_count=_vaccine_count(status="Upcoming"),
+        pending_count=_vaccine_count(status="Pending"),
+        next_due_date=Subquery(next_due.values("due_date")[:1]),
+        next_due_vaccine=Subquery(
+            next_due.annotate(name=Coalesce("vaccine_schedule__vaccine", "custom_vaccine")).values("name")[:1]
+        ),
+    )
+
+
+def vaccine_summary(patient):
+    """Summary block for a patient annotated by with_vaccine_summary."""
+    return {
+        "completed": patient.completed_count,
+        "upcoming": patient.upcoming_count,
+        "pending": patient.pending_count,
+        "next_due_date": patient.next_due_date.strftime("%d-%b-%Y") if patient.next_due_date else None,
+        "next_due_vaccine": patient.next_due_vaccine,
+    }
+
+
+def open_appointments(user):
+    """Vaccines still to be given to the account's active patients."""
+    return PatientVaccine.objects.filter(user=user, is_completed=False, patient__is_active=True)
@@ -1,19 +1,37 @@
+import json
+from collections import Counter
 from datetime import date
 from django.shortcuts import render, get_object_or_404
 from rest_framework import serializers, generics
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from django.db import models
+from django.db import models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from doctorApp.models import VaccineSchedule
+from doctorApp.catalog import search_catalog
 from doctorApp.utils import send_whatsapp_template, send_registered_whatsapp
 from patientApp.models import Patient, PatientVaccine
 from rest_framework import status
-from patientApp.serializers import PatientSerializer, PatientVaccineSerializer, UpcomingPatientVaccineSerializer
+from patientApp.serializers import PatientSerializer, PatientVaccineSerializer, UpcomingPatientVaccineSerializer, \
+    BulkVaccineCompletionSerializer, AppointmentCalendarSerializer
+from patientApp.utils import sync_patient_vaccines, welcome_doctor_name, with_vaccine_summary, vaccine_summary, \
+    open_appointments
+from patientApp.importer import ImportFormatError, iter_import_rows, import_patients
+from patientApp.search import search_patients
+from patientApp.pagination import KeysetPagination, wants_keyset
+from patientApp.sync import SyncTokenError, SyncTokenExpired, changes_since
+from analyticsApp.rollups import VACCINE_FIELDS, apply_deltas, changed, vaccine_bucket
+from dashboardApp.etags import bump_data_version, conditional_get, today_key
+from timelytots.sparse_fields import requested_fieldset
+from rest_framework.exceptions import NotFound
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from datetime import timedelta
 from math import ceil
-from django.db.models import Q
+from django.db.models import Q, Count
+from django.db.models.functions import Coalesce
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.utils.urls import replace_query_param, remove_query_param
 
@@ -50,29 +68,52 @@ class PatientPagination(PageNumberPagination):
 class PatientViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 6, "put": 7}
     
+    @conditional_get("patients")
     def get(self, request):
         try:
-            patients = Patient.objects.filter(user=request.user).order_by('-id')
-
-            if not patients.exists():
+            # ?fields= / ?expand= render and load only the requested columns.
+            serializer = PatientSerializer(**requested_fieldset(request))
+            patients = serializer.restrict_queryset(Patient.objects.filter(user=request.user).order_by('-id'))
+
+            # ?summary=1 embeds vaccine counts and the next due vaccine per patient.
+            include_summary = request.query_params.get('summary', '').lower() in ('1', 'true')
+            if include_summary:
+                patients = with_vaccine_summary(patients)
+
+            if wants_keyset(request):
+                paginator = KeysetPagination(ordering=('-id',))
+                paginated_patients = paginator.paginate_queryset(patients, request)
+                if not paginated_patients and paginator.is_first_page:
+                    return Response({'message': 'no patients found.'}, status=status.HTTP_204_NO_CONTENT)
+
+            elif not patients.exists():
                 return Response(
                     {'message': 'no patients found.'},
                     status=status.HTTP_204_NO_CONTENT
                 )
 
-            paginator = PatientPagination()
-            paginated_patients = paginator.paginate_queryset(patients, request)
+            else:
+                paginator = PatientPagination()
+                paginated_patients = paginator.paginate_queryset(patients, request)
 
             response_data = []
 
             for patient in paginated_patients:
-                response_data.append({
-                    "patient": PatientSerializer(patient).data
-                })
+                item = {"patient": serializer.to_representation(patient)}
+                if include_summary:
+                    item["vaccine_summary"] = vaccine_summary(patient)
+                response_data.append(item)
 
             return paginator.get_paginated_response(response_data)
 
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        except NotFound as e:
+            return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -82,43 +123,16 @@ class PatientViews(APIView):
     def put(self, request, id):
         try:
             patient = get_object_or_404(Patient, id=id, user=request.user)
-            today = date.today()
+            sync_patient_vaccines(patient)
 
-            schedules = VaccineSchedule.objects.filter(models.Q(patient=patient) | models.Q(user__is_staff=True))
+            # One query with the schedule and its author joined, grouped by status in memory.
+            vaccines = PatientVaccine.objects.filter(patient=patient, user=request.user) \
+                .select_related("patient", "vaccine_schedule__user") \
+                .order_by("vaccine_schedule__age_order", "id")
 
-            for schedule in schedules:
-                due_date = schedule.due_date
-                if due_date is None:
-                    continue
-
-                pv, created = PatientVaccine.objects.get_or_create(
-                    patient=patient,
-                    vaccine_schedule=schedule,
-                    user=request.user,
-                    defaults={"due_date": due_date}
-                )
-
-                if created or pv.status != "Completed":
-                    if today > due_date:
-                        pv.status = "Completed"
-                        pv.is_completed = True
-                        pv.completed_on = today
-                        pv.completed_at = "Auto-generated"
-                    elif today == due_date:
-                        pv.status = "Pending"
-                        pv.is_completed = False
-                    else:
-                        pv.status = "Upcoming"
-                        pv.is_completed = False
-                    pv.save()
-
-            vaccines = PatientVaccine.objects.filter(patient=patient, user=request.user).order_by("vaccine_schedule__age_order")
-
-            categorized = {
-                "Completed": PatientVaccineSerializer(vaccines.filter(status="Completed"), many=True).data,
-                "Upcoming": PatientVaccineSerializer(vaccines.filter(status="Upcoming"), many=True).data,
-                "Pending": PatientVaccineSerializer(vaccines.filter(status="Pending"), many=True).data,
-            }
+            categorized = {"Completed": [], "Upcoming": [], "Pending": []}
+            for vaccine in PatientVaccineSerializer(vaccines, many=True).data:
+                categorized.setdefault(vaccine["status"], []).append(vaccine)
 
             return Response({
                 "patient": PatientSerializer(patient).data,
@@ -135,50 +149,10 @@ class PatientViews(APIView):
             if serializer.is_valid():
                 patient = serializer.save()
     
-                today = date.today()
-                schedules = VaccineSchedule.objects.filter(models.Q(patient=patient) | models.Q(user__is_staff=True))
-    
-                for schedule in schedules:
-                    due_date = schedule.due_date
-                    if due_date is None:
-                        continue
-    
-                    pv, created = PatientVaccine.objects.get_or_create(
-                        patient=patient,
-                        vaccine_schedule=schedule,
-                        user=request.user,
-                        defaults={"due_date": due_date}
-                    )
-    
-                    if created or pv.status != "Completed":
-                        if today > due_date:
-                            pv.status = "Completed"
-                            pv.is_completed = True
-                            pv.completed_on = today
-                            pv.completed_at = "Auto-generated"
-                        elif today == due_date:
-                            pv.status = "Pending"
-                            pv.is_completed = False
-                        else:
-                            pv.status = "Upcoming"
-                            pv.is_completed = False
-                        pv.save()
-    
-                user = request.user
-                if user.account_type == "doctor":
-                    doctor_name = user.full_name
-                elif user.account_type == "clinic":
-                    if patient.doctor:
-                        doctor_name = patient.doctor.name
-                    else:
-                        doctor_name = "Doctor"
-                else:
-                    doctor_name = "Doctor"
-    
                 send_registered_whatsapp(
                     mobile_number=patient.mobile_number,
                     child_name=patient.child_name,
-                    doctor_name=doctor_name,
+                    doctor_name=welcome_doctor_name(patient),
                     dob=patient.date_of_birth
                 )
     
@@ -230,18 +204,46 @@ class PatientViews(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class PatientImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        try:
+            send_welcome = request.query_params.get("send_welcome", "true").lower() != "false"
+            report = import_patients(request.user, iter_import_rows(request), send_welcome=send_welcome)
+            return Response(report, status=status.HTTP_200_OK)
+
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class PatientSearch(APIView):
+    max_limit = 50
+    query_budgets = {"get": 5}
+
+    @conditional_get("patients")
     def get(self, request):
         try:
             query = request.query_params.get('search', '')
-            patient = Patient.objects.filter(
-                (Q(child_name__icontains=query) | Q(mobile_number__icontains=query)),
-                user=request.user
-            ).order_by('-id')
-
-            if patient:
-                serializers = PatientSerializer(patient, many=True)
-                return Response(serializers.data, status=status.HTTP_200_OK)
+            try:
+                limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_limit)
+                offset = max(int(request.query_params.get('offset', 0)), 0)
+            except ValueError:
+                return Response({'error': 'limit and offset must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            patients, has_more = search_patients(request.user, query, limit=limit, offset=offset)
+
+            if patients or offset:
+                # Same list body as before pagination; the next page's offset travels in a header.
+                serializers = PatientSerializer(patients, many=True)
+                response = Response(serializers.data, status=status.HTTP_200_OK)
+                if has_more:
+                    response['X-Next-Offset'] = offset + limit
+                return response
 
             else:
                 return Response({'message': 'No patient found'}, status=status.HTTP_204_NO_CONTENT)
@@ -291,24 +293,85 @@ class PatientMarkInactive(APIView):
 class PatientVaccineViews(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 4, "put": 2}
+
+    def filter_queryset(self, queryset, params):
+        """Apply ?status=, ?due_from=, ?due_to=, ?patient= and ?vaccine= (schedule id or name)."""
+        if params.get('status'):
+            valid_statuses = [choice for choice, _ in PatientVaccine.STATUS_CHOICES]
+            if params['status'] not in valid_statuses:
+                raise serializers.ValidationError(f"Invalid status. Must be one of {valid_statuses}")
+            queryset = queryset.filter(status=params['status'])
+
+        try:
+            if params.get('due_from'):
+                queryset = queryset.filter(due_date__gte=date.fromisoformat(params['due_from']))
+            if params.get('due_to'):
+                queryset = queryset.filter(due_date__lte=date.fromisoformat(params['due_to']))
+        except ValueError:
+            raise serializers.ValidationError("due_from and due_to must be dates in YYYY-MM-DD format.")
+
+        if params.get('patient'):
+            if not params['patient'].isdigit():
+                raise serializers.ValidationError("patient must be a patient id.")
+            queryset = queryset.filter(patient_id=params['patient'])
+
+        vaccine = params.get('vaccine')
+        if vaccine:
+            if vaccine.isdigit():
+                queryset = queryset.filter(vaccine_schedule_id=vaccine)
+            else:
+                queryset = queryset.filter(
+                    Q(vaccine_schedule__vaccine__iexact=vaccine) | Q(custom_vaccine__iexact=vaccine)
+                )
+
+        return queryset
 
+    def stream(self, queryset):
+        """Emit one JSON object per line as rows are read from a server-side cursor."""
+        serializer = PatientVaccineSerializer()
+        for vaccine in queryset.order_by('due_date', 'id').iterator(chunk_size=500):
+            yield json.dumps(serializer.to_representation(vaccine), cls=DjangoJSONEncoder) + "\n"
+
+    @conditional_get("patients")
     def get(self, request):
         try:
-            patient_vaccines = PatientVaccine.objects.filter(user=request.user).order_by('vaccine_schedule__age_order')
+            patient_vaccines = self.filter_queryset(
+                PatientVaccine.objects.filter(user=request.user).select_related('patient', 'vaccine_schedule__user'),
+                request.query_params,
+            ).order_by('vaccine_schedule__age_order')
+
+            # ?stream=1 sends newline-delimited JSON without building the response in memory.
+            if request.query_params.get('stream', '').lower() in ('1', 'true'):
+                return StreamingHttpResponse(self.stream(patient_vaccines), content_type='application/x-ndjson')
+
+            # ?cursor= or ?limit= opts in to pages of at most KeysetPagination.max_page_size rows.
+            if wants_keyset(request) or KeysetPagination.page_size_query_param in request.query_params:
+                paginator = KeysetPagination(ordering=('due_date', 'id'))
+                page = paginator.paginate_queryset(patient_vaccines, request)
+                return paginator.get_paginated_response(PatientVaccineSerializer(page, many=True).data)
 
             if patient_vaccines:
-                serializers = PatientVaccineSerializer(patient_vaccines, many=True)
-                return Response(serializers.data, status=status.HTTP_200_OK)
+                serializer = PatientVaccineSerializer(patient_vaccines, many=True)
+                return Response(serializer.data, status=status.HTTP_200_OK)
 
             else:
                 return Response({'message': 'no patients vaccine found.'}, status=status.HTTP_204_NO_CONTENT)
 
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        except NotFound as e:
+            return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def put(self, request, id):
         try:
-            patient_vaccines = get_object_or_404(PatientVaccine, id=id, user=request.user)
+            patient_vaccines = get_object_or_404(
+                PatientVaccine.objects.select_related("patient", "vaccine_schedule__user"), id=id, user=request.user
+            )
 
             if patient_vaccines:
                 serializers = PatientVaccineSerializer(patient_vaccines)
@@ -392,16 +455,94 @@ class MarkVaccinePendingView(generics.UpdateAPIView):
             return Response({"error": f"Something went wrong: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BulkMarkVaccineCompletedView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    query_budgets = {"patch": 7}
+
+    def patch(self, request):
+        """
+        Mark a list of the user's vaccines completed with one locking
+        ownership query and one UPDATE in the same transaction. Each id is
+        reported as completed, already_completed or not_found (missing or
+        owned by another account).
+        """
+        try:
+            serializer = BulkVaccineCompletionSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            data = serializer.validated_data
+            ids = list(dict.fromkeys(data["ids"]))
+
+            with transaction.atomic():
+                # The ownership read also carries what the dashboard rollup needs. Its row
+                # locks make a concurrent completion of the same ids wait, then read as done.
+                rows = {
+                    row["id"]: row
+                    for row in PatientVaccine.objects.filter(user=request.user, id__in=ids)
+                    .select_for_update(of=("self",)).values("id", *VACCINE_FIELDS)
+                }
+                owned = {vaccine_id: row["is_completed"] for vaccine_id, row in rows.items()}
+                to_complete = [vaccine_id for vaccine_id in ids if owned.get(vaccine_id) is False]
+
+                completed = 0
+                if to_complete:
+                    completed_on = data.get("completed_on", date.today())
+                    completed = PatientVaccine.objects.filter(id__in=to_complete, is_completed=False).update(
+                        is_completed=True,
+                        status="Completed",
+                        completed_on=completed_on,
+                        completed_at=data["completed_at"],
+                        updated_at=timezone.now(),
+                    )
+                    bump_data_version("patients", [request.user.id])
+
+                    # Only the locked rows the UPDATE changed move in the rollup, and in the
+                    # same transaction, so a completion counted by another request's signal
+                    # is not counted again.
+                    deltas = Counter()
+                    for vaccine_id in to_complete:
+                        row = rows[vaccine_id]
+                        deltas.update(changed(
+                            vaccine_bucket(*(row[field] for field in VACCINE_FIELDS)),
+                            vaccine_bucket(request.user.id, row["due_date"], "Completed", True, completed_on,
+                                           data["completed_at"], row["patient__is_active"]),
+                        ))
+                    apply_deltas(deltas)
+
+            results = {}
+            for vaccine_id in ids:
+                if vaccine_id not in owned:
+                    results[vaccine_id] = "not_found"
+                elif owned[vaccine_id]:
+                    results[vaccine_id] = "already_completed"
+                else:
+                    results[vaccine_id] = "completed"
+
+            return Response({"completed": completed, "results": results}, status=status.HTTP_200_OK)
+
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class VaccineSearch(APIView):
+    query_budgets = {"get": 3}
+
     def get(self, request):
         try:
             query = request.query_params.get('search', '')
-            vaccine = VaccineSchedule.objects.filter(age__icontains=query) | VaccineSchedule.objects.filter(
-                vaccine__icontains=query)
+            try:
+                limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+            except ValueError:
+                return Response({'error': 'limit must be an integer.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if vaccine:
-                serializers = VaccineSchedule(vaccine, many=True)
-                return Response(serializers.data, status=status.HTTP_200_OK)
+            # Answered from the in-process catalog index, not the VaccineSchedule table.
+            vaccines = search_catalog(query, limit=limit)
+
+            if vaccines:
+                return Response(vaccines, status=status.HTTP_200_OK)
 
             else:
                 return Response({'message': 'No vaccine found'}, status=status.HTTP_204_NO_CONTENT)
@@ -412,11 +553,14 @@ class VaccineSearch(APIView):
 
 class UpcomingAppointmentsView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budgets = {"get": 4}
 
+    @conditional_get("patients", extra=today_key)
     def get(self, request):
         try:
             today = date.today()
             next_30_days = today + timedelta(days=30)
+            fieldset = requested_fieldset(request)
 
             upcoming_appointments = PatientVaccine.objects.filter(
                 user=request.user,
@@ -424,10 +568,17 @@ class UpcomingAppointmentsView(APIView):
                 is_completed=False,
                 due_date__range=[today, next_30_days],
                 patient__is_active=True  # ✅ Only include active patients
-            ).order_by("due_date")
+            ).select_related("patient", "vaccine_schedule").order_by("due_date")
+            upcoming_appointments = UpcomingPatientVaccineSerializer(**fieldset) \
+                .restrict_queryset(upcoming_appointments, "due_date")
+
+            if wants_keyset(request):
+                paginator = KeysetPagination(ordering=("due_date", "id"))
+                page = paginator.paginate_queryset(upcoming_appointments, request)
+                return paginator.get_paginated_response(UpcomingPatientVaccineSerializer(page, many=True, **fieldset).data)
 
             if upcoming_appointments.exists():
-                serializer = UpcomingPatientVaccineSerializer(upcoming_appointments, many=True)
+                serializer = UpcomingPatientVaccineSerializer(upcoming_appointments, many=True, **fieldset)
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response(
@@ -435,8 +586,112 @@ class UpcomingAppointmentsView(APIView):
                     status=status.HTTP_204_NO_CONTENT
                 )
 
+        except serializers.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+        except NotFound as e:
+            return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
+
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AppointmentCalendarView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 3}
+
+    @conditional_get("patients", extra=today_key)
+    def get(self, request):
+        """Per-day counts of open vaccines and distinct patients for ?start=&end=, from one GROUP BY."""
+        try:
+            serializer = AppointmentCalendarSerializer(data=request.query_params)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            start, end = serializer.validated_data["start"], serializer.validated_data["end"]
+
+            days = open_appointments(request.user).filter(due_date__range=[start, end]) \
+                .values("due_date") \
+                .annotate(vaccines=Count("id"), patients=Count("patient", distinct=True)) \
+                .order_by("due_date")
+
+            return Response({
+                "start": start,
+                "end": end,
+                "days": [
+                    {"date": day["due_date"], "vaccines": day["vaccines"], "patients": day["patients"]}
+                    for day in days
+                ],
+            }, status=status.HTTP_200_OK)
 
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AppointmentDayView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 3}
+
+    @conditional_get("patients")
+    def get(self, request, day):
+        """
+        Open vaccines due on one calendar day. Each patient appears once in
+        the "patients" side table, keyed by id, however many vaccines they have.
+        """
+        try:
+            try:
+                day = date.fromisoformat(day)
+            except ValueError:
+                return Response({"error": "Date must be in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+
+            rows = open_appointments(request.user).filter(due_date=day) \
+                .annotate(vaccine_name=Coalesce("vaccine_schedule__vaccine", "custom_vaccine")) \
+                .values(
+                    "id", "status", "vaccine_name", "vaccine_schedule__age", "patient_id",
+                    "patient__child_name", "patient__mobile_number", "patient__date_of_birth",
+                    "patient__gender", "patient__doctor_id",
+                ).order_by("patient__child_name", "patient_id", "id")
+
+            appointments, patients = [], {}
+            for row in rows:
+                appointments.append({
+                    "id": row["id"],
+                    "patient": row["patient_id"],
+                    "vaccine_name": row["vaccine_name"],
+                    "vaccine_age": row["vaccine_schedule__age"],
+                    "status": row["status"],
+                })
+                patients.setdefault(row["patient_id"], {
+                    "child_name": row["patient__child_name"],
+                    "mobile_number": row["patient__mobile_number"],
+                    "date_of_birth": row["patient__date_of_birth"],
+                    "gender": row["patient__gender"],
+                    "doctor": row["patient__doctor_id"],
+                })
+
+            return Response({"date": day, "appointments": appointments, "patients": patients},
+                            status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+    query_budgets = {"get": 8}
+
+    def get(self, request):
+        """Delta sync: rows changed and ids deleted since ?since=<token>, plus the next token."""
+        try:
+            return Response(changes_since(request.user, request.query_params.get("since")), status=status.HTTP_200_OK)
+
+        except SyncTokenExpired as e:
+            return Response({"error": str(e), "full_sync_required": True}, status=status.HTTP_410_GONE)
+
+        except SyncTokenError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
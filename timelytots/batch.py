@@ -0,0 +1,138 @@
+"""
+Batch endpoint: several GET sub-requests answered in one round trip.
+
+The dashboard fans out to half a dozen small read endpoints on load. POST
+/api/batch/ with {"requests": [{"id": "patients", "path": "total/count/"},
+...]} runs each view in-process: the caller is authenticated once and the
+sub-requests reuse that user, and sequential batches share one database
+connection. With "parallel": true the reads run on a small thread pool,
+each thread on its own connection.
+
+Only DRF views can be batched. Sub-requests go straight to the view and
+skip the middleware stack: the batch call has already passed CORS,
+security and authentication, and each view's query budget is checked here
+in place of QueryBudgetMiddleware.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from timelytots.query_budget import budget_mode, check_budget, record_queries
+
+
+logger = logging.getLogger(__name__)
+
+# Request metadata carried over to sub-requests, so links they build carry
+# the batch call's scheme and host; conditional headers are left out
+# because they belong to the batch call, not its parts.
+_SHARED_META = ("HTTP_HOST", "HTTP_X_FORWARDED_HOST", "HTTP_X_FORWARDED_PROTO", "HTTP_ACCEPT_LANGUAGE",
+                "HTTP_USER_AGENT", "SERVER_NAME", "SERVER_PORT", "REMOTE_ADDR", "wsgi.url_scheme")
+
+
+class _SubRequest(HttpRequest):
+    def _get_scheme(self):
+        # As WSGIRequest does; a bare HttpRequest always answers "http".
+        return self.META.get("wsgi.url_scheme", "http")
+
+
+def _normalize_path(path):
+    # Paths may be given relative to /api/, as the app's client does.
+    return path if path.startswith("/") else f"/api/{path}"
+
+
+def _sub_request(request, path):
+    url = urlsplit(_normalize_path(path))
+    sub = _SubRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = url.path
+    shared = _SHARED_META + tuple(settings.SECURE_PROXY_SSL_HEADER or ())[:1]
+    sub.META = {key: request.META[key] for key in shared if key in request.META}
+    sub.META.update(REQUEST_METHOD="GET", QUERY_STRING=url.query)
+    sub.GET = QueryDict(url.query)
+    # DRF reads these and skips authentication: the batch call already did it.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _run(request, item):
+    """Response entry for one sub-request: {"id", "status", "body"}."""
+    entry = {"id": item.get("id")}
+    path = item.get("path")
+    if item.get("method", "GET").upper() != "GET":
+        return {**entry, "status": 405, "body": {"error": "Only GET requests can be batched."}}
+    if not isinstance(path, str) or not path:
+        return {**entry, "status": 400, "body": {"error": "Each request needs a path."}}
+
+    sub = _sub_request(request, path)
+    try:
+        match = resolve(sub.path_info)
+    except Resolver404:
+        return {**entry, "status": 404, "body": {"error": f"No endpoint at {sub.path}."}}
+    view_class = getattr(match.func, "view_class", None)
+    if not (isinstance(view_class, type) and issubclass(view_class, APIView)):
+        return {**entry, "status": 400, "body": {"error": "This endpoint cannot be batched."}}
+    if view_class is BatchView:
+        return {**entry, "status": 400, "body": {"error": "Batches cannot be nested."}}
+
+    budgets = getattr(view_class, "query_budgets", None) or {}
+    try:
+        if budget_mode() != "off" and "get" in budgets:
+            with record_queries() as recorder:
+                response = match.func(sub, *match.args, **match.kwargs)
+            check_budget(f"GET {view_class.__name__} (batched)", budgets["get"], recorder)
+        else:
+            response = match.func(sub, *match.args, **match.kwargs)
+    except Exception as e:
+        logger.exception("Batched request to %s failed: %s", sub.path, e)
+        return {**entry, "status": 500, "body": {"error": str(e)}}
+
+    if not isinstance(response, Response):
+        # Streamed or file responses from a DRF view.
+        return {**entry, "status": 400, "body": {"error": "This endpoint cannot be batched."}}
+    return {**entry, "status": response.status_code, "body": response.data}
+
+
+def _run_in_thread(request, item):
+    try:
+        return _run(request, item)
+    finally:
+        # Worker threads open their own connections; don't leave them idle in the pool.
+        connection.close()
+
+
+class BatchView(APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [JWTAuthentication]
+
+    def post(self, request):
+        try:
+            items = request.data.get("requests") if hasattr(request.data, "get") else None
+            max_requests = getattr(settings, "BATCH_MAX_REQUESTS", 10)
+            if not isinstance(items, list) or not items:
+                return Response({"error": "Send a non-empty 'requests' list."}, status=status.HTTP_400_BAD_REQUEST)
+            if len(items) > max_requests:
+                return Response({"error": f"At most {max_requests} requests per batch."}, status=status.HTTP_400_BAD_REQUEST)
+            items = [item if isinstance(item, dict) else {"path": item} for item in items]
+
+            if request.data.get("parallel") and len(items) > 1:
+                workers = min(len(items), getattr(settings, "BATCH_MAX_WORKERS", 4))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    responses = list(pool.map(lambda item: _run_in_thread(request, item), items))
+            else:
+                responses = [_run(request, item) for item in items]
+
+            return Response({"responses": responses}, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
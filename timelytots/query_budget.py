@@ -0,0 +1,110 @@
+"""
+Query-count budgets for views and Celery tasks.
+
+Views declare ``query_budgets = {"get": 4, ...}`` per HTTP method and tasks
+are wrapped with ``@query_budget(n)``. QUERY_BUDGET_MODE decides what
+happens when a budget is exceeded: "raise" (used by the test suite), "log",
+or "off" (nothing is counted).
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view or task ran more SQL queries than its declared budget."""
+
+
+def budget_mode():
+    return getattr(settings, "QUERY_BUDGET_MODE", "off")
+
+
+class QueryRecorder:
+    """Execute wrapper that counts queries and keeps their SQL for the report."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def check_budget(name, budget, recorder):
+    if recorder.count <= budget:
+        return
+
+    repeated = "\n".join(
+        f"  {times}x {sql[:200]}" for sql, times in Counter(recorder.queries).most_common(3)
+    )
+    message = f"{name} ran {recorder.count} queries, budget is {budget}. Most repeated:\n{repeated}"
+
+    if budget_mode() == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.error(message)
+
+
+def query_budget(budget):
+    """
+    Decorator enforcing a query budget on a function or Celery task body.
+    The budget may be a callable taking the call's arguments, for work that
+    is one query per item by design.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if budget_mode() == "off":
+                return func(*args, **kwargs)
+            with record_queries() as recorder:
+                result = func(*args, **kwargs)
+            limit = budget(*args, **kwargs) if callable(budget) else budget
+            check_budget(func.__qualname__, limit, recorder)
+            return result
+        wrapper.query_budget = budget
+        return wrapper
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """Counts the queries of each request and checks the view's query_budgets entry."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if budget_mode() == "off":
+            return self.get_response(request)
+
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        budget = getattr(request, "_query_budget", None)
+        if budget is not None:
+            # Streaming bodies are produced after this point and are not counted.
+            check_budget(*budget, recorder)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "view_class", None)
+        budgets = getattr(view_class, "query_budgets", None) or getattr(view_func, "query_budgets", None)
+        if budgets and request.method.lower() in budgets:
+            name = f"{request.method} {getattr(view_class, '__name__', view_func.__name__)}"
+            request._query_budget = (name, budgets[request.method.lower()])
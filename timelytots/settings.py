@@ -43,6 +43,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'timelytots.query_budget.QueryBudgetMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -54,6 +55,9 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Response headers browser clients may read (patient search pagination)
+CORS_EXPOSE_HEADERS = ["X-Next-Offset"]
+
 
 ROOT_URLCONF = 'timelytots.urls'
 
@@ -181,8 +185,82 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'doctorApp.firebase_utils.send_missed_vaccine_notifications',
         'schedule': crontab(hour=11, minute=0),  # 11:00 AM IST
     },
+
+    # 🌙 Move vaccines between Upcoming / Pending / Completed by due date
+    'update-vaccine-statuses-every-night': {
+        'task': 'patientApp.tasks.update_vaccine_statuses',
+        'schedule': crontab(hour=0, minute=30),  # 12:30 AM IST
+    },
+
+    # 💤 Deactivate patients with vaccines overdue for more than a week
+    'mark-patients-inactive-every-night': {
+        'task': 'patientApp.tasks.mark_patients_inactive',
+        'schedule': crontab(hour=1, minute=0),  # 1:00 AM IST
+    },
+
+    # 🔁 Pick up schedule propagations that stalled or were never queued
+    'resume-schedule-propagations': {
+        'task': 'doctorApp.tasks.resume_schedule_propagations',
+        'schedule': crontab(minute='*/15'),
+    },
+
+    # 📊 Rebuild dashboard rollups after the nightly status / inactive jobs
+    'reconcile-doctor-stats': {
+        'task': 'analyticsApp.tasks.reconcile_doctor_stats',
+        'schedule': crontab(hour=1, minute=30),  # 1:30 AM IST
+    },
+
+    # 🪦 Drop delta sync tombstones past their retention
+    'purge-sync-tombstones': {
+        'task': 'patientApp.tasks.purge_sync_tombstones',
+        'schedule': crontab(hour=2, minute=0),  # 2:00 AM IST
+    },
 }
 
+# Background propagation of catalog schedule changes to existing patients
+SCHEDULE_PROPAGATION_BATCH_SIZE = 500     # patients per batch
+SCHEDULE_PROPAGATION_THROTTLE = 0.2       # seconds to pause between batches
+SCHEDULE_PROPAGATION_TIME_BUDGET = 240    # seconds per task run before re-queueing
+
+# Rows per UPDATE statement in the nightly vaccine status / inactive patient jobs
+VACCINE_STATUS_BATCH_SIZE = 5000
+
+# Bulk patient import
+PATIENT_IMPORT_BATCH_SIZE = 500      # patients per insert transaction
+PATIENT_IMPORT_MAX_ROWS = 20000
+WELCOME_MESSAGES_PER_SECOND = 5      # pace of deferred registration WhatsApps
+
+# Shared cache (vaccine catalog etc.); callers treat Redis errors as cache misses
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_CACHE_URL", "redis://localhost:6379/2"),
+    }
+}
+
+# How often each process re-checks the catalog version behind the vaccine search index
+VACCINE_SEARCH_VERSION_CHECK_SECONDS = 30
+
+# Cached analytics and billing responses (analyticsApp.cache); writes replace the per-account version
+ANALYTICS_CACHE_TIMEOUT = 60 * 15      # seconds an entry lives if nothing changes
+ANALYTICS_CACHE_LOCK_SECONDS = 10      # single-flight lock held while one request recomputes a miss
+ANALYTICS_CACHE_WAIT_SECONDS = 2       # how long other requests wait for that result
+
+# Accounts per batch when the nightly job rebuilds DoctorDailyStats
+ROLLUP_REBUILD_BATCH_SIZE = 200
+
+# Delta sync API (/api/sync/)
+SYNC_PAGE_SIZE = 500                 # rows per entity per response
+SYNC_SETTLE_SECONDS = 5              # margin before the oldest open write transaction; see patientApp.sync.settled_before
+SYNC_TOMBSTONE_RETENTION_DAYS = 90   # older sync tokens must start a full sync
+
+# Batch endpoint (/api/batch/)
+BATCH_MAX_REQUESTS = 10   # sub-requests per batch
+BATCH_MAX_WORKERS = 4     # threads for "parallel": true batches
+
+# Per-view / per-task SQL query budgets: "off", "log" or "raise" (tests)
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off")
+
     
 CSRF_TRUSTED_ORIGINS = [
     "https://app.timelytots.com",
@@ -0,0 +1,121 @@
+"""
+Sparse fieldsets for list endpoints.
+
+Clients pass ``?fields=id,child_name`` to get only those fields back, with
+dotted names reaching into nested objects (``patient.child_name``), and
+``?expand=doctor`` to render a relation listed in the serializer's
+``Meta.expandable`` as a nested object instead of its primary key. The
+same serializer tells the view which columns to load, so the queryset
+selects only what is rendered.
+"""
+from rest_framework import serializers
+
+
+def _split(paths):
+    """Group dotted paths by their first segment: ['a', 'b.c'] -> {'a': [], 'b': ['c']}."""
+    grouped = {}
+    for path in paths:
+        head, _, rest = path.partition(".")
+        grouped.setdefault(head, [])
+        if rest:
+            grouped[head].append(rest)
+    return grouped
+
+
+def _param_list(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def requested_fieldset(request):
+    """Serializer kwargs for the request's ?fields= and ?expand= parameters."""
+    return {"fields": _param_list(request, "fields"), "expand": _param_list(request, "expand") or []}
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin adding `fields` and `expand` keyword arguments.
+
+    Meta.expandable maps relation names to the serializer used when they
+    are expanded. Meta.column_sources maps fields the model columns cannot
+    be derived for (method fields, string relations) to the columns they
+    read, in queryset lookup syntax.
+    """
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, "expandable", {})
+        fields = None if fields is None else _split(fields)
+        expand = _split(expand)
+
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}."})
+            for name in list(self.fields):
+                if name not in fields:
+                    self.fields.pop(name)
+
+        for name in sorted(set(expand) | set(fields or ())):
+            if name not in self.fields:
+                continue
+            nested_fields = (fields or {}).get(name) or None
+            nested_expand = expand.get(name, [])
+
+            if name in expand and name in expandable:
+                self.fields[name] = expandable[name](read_only=True, fields=nested_fields, expand=nested_expand)
+            elif nested_fields or name in expand:
+                field = self.fields[name]
+                if not isinstance(field, SparseFieldsMixin):
+                    raise serializers.ValidationError({"expand" if name in expand else "fields": f"{name} cannot be expanded."})
+                source = {} if field.source == name else {"source": field.source}
+                self.fields[name] = type(field)(read_only=True, fields=nested_fields, expand=nested_expand, **source)
+
+    def load_columns(self):
+        """
+        (columns, relations) for queryset.only() and select_related(), or
+        None when a rendered field reads something that cannot be named.
+        """
+        column_sources = getattr(self.Meta, "column_sources", {})
+        columns, relations = set(), set()
+
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, SparseFieldsMixin):
+                nested = field.load_columns()
+                if nested is None:
+                    return None
+                prefix = field.source.replace(".", "__")
+                relations.add(prefix)
+                relations.update(f"{prefix}__{relation}" for relation in nested[1])
+                columns.update(f"{prefix}__{column}" for column in nested[0])
+                continue
+
+            if name in column_sources:
+                paths = column_sources[name]
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)) \
+                    or field.source == "*":
+                return None
+            else:
+                paths = [field.source.replace(".", "__")]
+
+            for path in paths:
+                columns.add(path)
+                parts = path.split("__")[:-1]
+                relations.update("__".join(parts[:i]) for i in range(1, len(parts) + 1))
+
+        return sorted(columns), sorted(relations)
+
+    def restrict_queryset(self, queryset, *keep):
+        """Load only the columns this serializer renders, plus `keep` (e.g. ordering keys)."""
+        loaded = self.load_columns()
+        if loaded is None:
+            return queryset
+        columns, relations = loaded
+        # select_related(None) drops joins the view added for fields no longer rendered.
+        return queryset.select_related(None).select_related(*relations).only("pk", *columns, *keep)
+
@@ -3,8 +3,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from timelytots.batch import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/batch/', BatchView.as_view(), name='batch'),
     path('auth/', include('authenticationApp.urls')),
     path('api/', include('patientApp.urls')),
     path('api/', include('doctorApp.urls')),